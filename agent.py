@@ -12,15 +12,20 @@ fleetcron agent v3 - dynamic order + Telegram alerts
 2. SSL 인증서 문제 해결 - certifi 경로 명시
 3. 머신 실행 순서 문제 해결 - 레이스 컨디션 방지
 """
-import os, sys, time, json, uuid, socket, signal, threading, traceback, subprocess
+import os, sys, re, time, json, uuid, socket, signal, random, threading, traceback, subprocess, bisect
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from array import array
 from typing import Dict, Any, List, Tuple, Optional
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import shutil
 
 import requests
-from pymongo import MongoClient, ReturnDocument
-from pymongo.errors import DuplicateKeyError, PyMongoError
+from requests.adapters import HTTPAdapter
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 
 # 필수 패키지 설치 확인
 MISSING_PACKAGES = []
@@ -67,14 +72,44 @@ try:
 except ImportError:
     USE_CLOUDSCRAPER = False
 
+# pycurl (선택, use_curl 요청을 curl 프로세스 대신 libcurl로 실행)
+try:
+    import pycurl
+    from io import BytesIO
+    USE_PYCURL = True
+except ImportError:
+    USE_PYCURL = False
+
+# orjson (선택, 설정/머신 파일 JSON 파싱 가속)
+try:
+    import orjson
+    USE_ORJSON = True
+except ImportError:
+    USE_ORJSON = False
+
 # 필수 패키지가 없으면 종료
 if MISSING_PACKAGES:
     print(f"\n❌ CRITICAL: Missing required packages: {', '.join(MISSING_PACKAGES)}")
     print(f"Please install: pip install {' '.join(MISSING_PACKAGES)}")
     sys.exit(1)
 
-# 전역 HTTP 세션 및 헬퍼
+# 전역 HTTP 세션 및 헬퍼 (작업/리트라이 간 TCP+TLS 연결 재사용)
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
 HTTP_SESSION = requests.Session()
+for _prefix in ("https://", "http://"):
+    HTTP_SESSION.mount(_prefix, HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                            pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0))
+# cloudscraper는 챌린지 상태를 인스턴스에 보관하므로 스레드별로 하나씩 재사용
+_SCRAPER_LOCAL = threading.local()
+
+def get_scraper():
+    scraper = getattr(_SCRAPER_LOCAL, "scraper", None)
+    if scraper is None:
+        scraper = cloudscraper.create_scraper()
+        _SCRAPER_LOCAL.scraper = scraper
+    return scraper
+
 NOTIFIER = None  # type: Optional["NotificationManager"]
 
 # order 설정 (CFG 로드 전 임시 초기값)
@@ -84,6 +119,30 @@ DEFAULT_ORDER_VALUE = 9999
 MAX_ACTIVE_MACHINES = 10
 
 
+def json_loads(data: bytes) -> Any:
+    """orjson이 있으면 사용하고 없으면 표준 json으로 파싱"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """orjson이 있으면 사용하고 없으면 표준 json으로 직렬화 (UTF-8 bytes)"""
+    if USE_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """임시 파일에 쓰고 fsync 후 교체해, 중간에 종료되어도 반쯤 쓰인 파일이 남지 않게 한다"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
 def safe_close_response(resp):
     """requests/HTTP 응답 객체를 안전하게 닫는다."""
     if resp is None:
@@ -122,8 +181,7 @@ def load_config() -> Dict[str, Any]:
         print(f"[config] 설정 파일이 없습니다: {cfg_path}\n"
               f"동일 폴더 또는 {HOME_CONFIG} 위치에 {CONFIG_BASENAME}를 만들어 주세요.", file=sys.stderr)
         sys.exit(1)
-    with open(cfg_path, "r", encoding="utf-8") as fp:
-        cfg = json.load(fp)
+    cfg = json_loads(cfg_path.read_bytes())
 
     # 기본값
     cfg.setdefault("db_name", "fleetcron")
@@ -134,12 +192,13 @@ def load_config() -> Dict[str, Any]:
     cfg.setdefault("order_field", "order")
     cfg.setdefault("http_defaults", {"timeout_sec": 10, "retry": {"retries": 2, "delay_sec": 3, "backoff": 1.5}})
     cfg.setdefault("secrets", {})
+    cfg.setdefault("job_concurrency", 8)
     return cfg
 
 CFG = load_config()
 
 def refresh_order_settings():
-    global PRIMARY_ORDER_FIELD, ORDER_FIELD_ALIASES, DEFAULT_ORDER_VALUE, MAX_ACTIVE_MACHINES
+    global PRIMARY_ORDER_FIELD, ORDER_FIELD_ALIASES, DEFAULT_ORDER_VALUE, MAX_ACTIVE_MACHINES, OFFSET_STEP_SEC
     PRIMARY_ORDER_FIELD = CFG.get("order_field", "order")
     ORDER_FIELD_ALIASES = []
     for key in (PRIMARY_ORDER_FIELD, "order", "serial"):
@@ -147,10 +206,46 @@ def refresh_order_settings():
             ORDER_FIELD_ALIASES.append(key)
     DEFAULT_ORDER_VALUE = int(CFG.get("default_order", 9999))
     MAX_ACTIVE_MACHINES = int(CFG.get("max_order", CFG.get("max_serial", 10)))
+    # 순서 간 대기 간격 (기본 5초). 0이면 순서가 무의미해지므로 최소 1초
+    OFFSET_STEP_SEC = max(1, int(CFG.get("order_offset_sec", 5)))
 
 
 refresh_order_settings()
 
+# 시크릿 템플릿 치환용 정규식 (설정 로드 시 한 번만 컴파일)
+SECRET_PATTERN = None  # type: Optional["re.Pattern"]
+SECRET_VALUES: Dict[str, str] = {}
+SECRET_VERSION = 0  # 시크릿이 다시 로드될 때마다 증가 (미리 해석한 템플릿 무효화용)
+
+
+def refresh_secret_templates():
+    global SECRET_PATTERN, SECRET_VALUES, SECRET_VERSION
+    SECRET_VERSION += 1
+    secrets = CFG.get("secrets") or {}
+    SECRET_VALUES = {str(k): str(v) for k, v in secrets.items()}
+    if SECRET_VALUES:
+        SECRET_PATTERN = re.compile(r"\{\{(" + "|".join(map(re.escape, SECRET_VALUES)) + r")\}\}")
+    else:
+        SECRET_PATTERN = None
+
+
+refresh_secret_templates()
+
+# HTTP 기본값 (설정 로드 시 한 번만 꺼내 둔다)
+HTTP_DEFAULTS: Dict[str, Any] = {}
+HTTP_DEFAULT_TIMEOUT = 10
+HTTP_DEFAULT_RETRY: Dict[str, Any] = {}
+
+
+def refresh_http_defaults():
+    global HTTP_DEFAULTS, HTTP_DEFAULT_TIMEOUT, HTTP_DEFAULT_RETRY
+    HTTP_DEFAULTS = dict(CFG.get("http_defaults") or {})
+    HTTP_DEFAULT_TIMEOUT = HTTP_DEFAULTS.get("timeout_sec", 10)
+    HTTP_DEFAULT_RETRY = HTTP_DEFAULTS.get("retry") or {}
+
+
+refresh_http_defaults()
+
 # -------------------- PyInstaller 환경 수정 --------------------
 def fix_pyinstaller_environment():
     """PyInstaller 빌드 환경에서 발생하는 문제 해결"""
@@ -204,7 +299,16 @@ def setup_timezone():
     print(f"\n=== Timezone Setup ===")
     print(f"Requested timezone: {tz_config}")
     
-    # 방법 1: pytz 사용 (가장 안정적)
+    # 방법 1: 한국 시간은 DST가 없으므로 고정 오프셋으로 바로 설정 (tz DB 조회 생략)
+    if tz_config == "Asia/Seoul":
+        CRON_TZ = timezone(timedelta(hours=9), "KST")
+        ACTUAL_TZ_NAME = "Asia/Seoul (UTC+9)"
+        print(f"✓ Using fixed Korea timezone (UTC+9)")
+        test_time = datetime.now(CRON_TZ)
+        print(f"  Current time: {test_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        return
+    
+    # 방법 2: pytz 사용 (가장 안정적)
     if HAS_PYTZ:
         try:
             CRON_TZ = pytz.timezone(tz_config)
@@ -218,15 +322,6 @@ def setup_timezone():
         except Exception as e:
             print(f"⚠️ pytz failed: {e}")
     
-    # 방법 2: 수동 UTC 오프셋 설정 (한국 시간 특별 처리)
-    if tz_config == "Asia/Seoul":
-        CRON_TZ = timezone(timedelta(hours=9))
-        ACTUAL_TZ_NAME = "Asia/Seoul (UTC+9)"
-        print(f"✓ Using manual Korea timezone (UTC+9)")
-        test_time = datetime.now(CRON_TZ)
-        print(f"  Current time: {test_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        return
-    
     # 방법 3: zoneinfo 시도 (Python 3.9+)
     try:
         from zoneinfo import ZoneInfo
@@ -274,7 +369,6 @@ if hasattr(local_now, 'utcoffset') and local_now.utcoffset():
     print(f"UTC offset: {hours:+03d}:{minutes:02d}")
 print("=" * 30 + "\n")
 
-OFFSET_STEP_SEC = 5  # 원래대로 5초 간격
 RESP_SAMPLE_MAX = 2000
 
 # -------------------- 파일 락(한 PC 1프로세스) --------------------
@@ -300,12 +394,10 @@ else:
 # -------------------- 머신 ID --------------------
 def load_or_create_machine_id() -> str:
     if MACHINE_FILE.exists():
-        with open(MACHINE_FILE, "r", encoding="utf-8") as fp:
-            d = json.load(fp)
-            if d.get("machine_id"): return d["machine_id"]
+        d = json_loads(MACHINE_FILE.read_bytes())
+        if d.get("machine_id"): return d["machine_id"]
     mid = str(uuid.uuid4())
-    with open(MACHINE_FILE, "w", encoding="utf-8") as fp:
-        json.dump({"machine_id": mid}, fp)
+    atomic_write_bytes(MACHINE_FILE, json_dumps({"machine_id": mid}))
     return mid
 
 
@@ -348,133 +440,260 @@ def ensure_machine_record(db, machine_id: str, hostname: str) -> Dict[str, Any]:
     return doc
 
 
-def get_all_machines_sorted(db) -> List[Dict[str, Any]]:
-    """order 값과 machine_id를 기준으로 정렬된 머신 목록을 반환"""
-    projection = {key: 1 for key in ORDER_FIELD_ALIASES}
-    projection.update({"machine_id": 1, "hostname": 1, "last_online_minute": 1})
-    machines = list(db.machines.find({}, projection))
-    machines.sort(key=lambda m: (extract_order_value(m), m.get("machine_id", "")))
-    return machines
-
-
-def get_order_context(db, machine_id: str, hostname: str) -> Tuple[List[Dict[str, Any]], int, int]:
-    """정렬된 머신 목록과 현재 머신의 위치/순서를 반환"""
-    machines = get_all_machines_sorted(db)
-    for idx, machine in enumerate(machines, 1):
-        if machine.get("machine_id") == machine_id:
-            order_value = extract_order_value(machine)
-            desired = build_order_field_map(order_value)
-            diff = {k: v for k, v in desired.items() if machine.get(k) != v}
-            if diff:
-                db.machines.update_one({"machine_id": machine_id}, {"$set": diff})
-                machine.update(diff)
-            return machines, idx, order_value
-
-    ensure_machine_record(db, machine_id, hostname)
-    machines = get_all_machines_sorted(db)
-    for idx, machine in enumerate(machines, 1):
-        if machine.get("machine_id") == machine_id:
-            order_value = extract_order_value(machine)
-            desired = build_order_field_map(order_value)
-            diff = {k: v for k, v in desired.items() if machine.get(k) != v}
-            if diff:
-                db.machines.update_one({"machine_id": machine_id}, {"$set": diff})
-                machine.update(diff)
-            return machines, idx, order_value
-
-    return machines, len(machines) + 1, DEFAULT_ORDER_VALUE
+def build_ahead_filter(order_value: int, machine_id: str) -> Dict[str, Any]:
+    """내 앞 순서 머신을 찾는 필터 (extract_order_value와 같은 alias 우선순위, 동률은 machine_id 순)"""
+    clauses = []
+    for idx, key in enumerate(ORDER_FIELD_ALIASES):
+        preceding = {k: None for k in ORDER_FIELD_ALIASES[:idx]}
+        clauses.append({**preceding, key: {"$lt": order_value}})
+        clauses.append({**preceding, key: order_value, "machine_id": {"$lt": machine_id}})
+    return {"$or": clauses}
+
+
+def get_order_context(db, machine_id: str, hostname: str, scheduled_minute_utc: datetime,
+                      machine_doc: Optional[Dict[str, Any]] = None) -> Tuple[int, int, int, int, bool]:
+    """현재 머신의 위치/order 값, 전체/온라인 머신 수, 앞순서 온라인 여부를 반환
+
+    머신 목록 전체를 받아 정렬하는 대신 서버에서 한 번의 집계($facet)로 개수만 계산한다.
+    $facet 내부는 인덱스를 쓰지 못하므로 앞단 $match로 후보를 인덱스 범위로 좁히고,
+    전체 머신 수는 컬렉션 메타데이터에서 읽는다.
+    machine_doc(하트비트 갱신 결과)가 주어지면 내 문서를 다시 조회하지 않는다.
+    """
+    doc = machine_doc
+    if not doc:
+        doc = db.machines.find_one({"machine_id": machine_id}, {key: 1 for key in ORDER_FIELD_ALIASES})
+    if not doc:
+        doc = ensure_machine_record(db, machine_id, hostname)
+
+    order_value = extract_order_value(doc)
+    desired = build_order_field_map(order_value)
+    diff = {k: v for k, v in desired.items() if doc.get(k) != v}
+    if diff:
+        db.machines.update_one({"machine_id": machine_id}, {"$set": diff})
+
+    online = {"last_online_minute": scheduled_minute_utc}
+    ahead = build_ahead_filter(order_value, machine_id)
+    pipeline = [
+        {"$match": {"$or": [online, ahead]}},
+        {"$project": {"_id": 0, "machine_id": 1, "last_online_minute": 1,
+                      **{key: 1 for key in ORDER_FIELD_ALIASES}}},
+        {"$facet": {
+            "online": [{"$match": online}, {"$count": "n"}],
+            "ahead": [{"$match": ahead}, {"$count": "n"}],
+            "ahead_online": [{"$match": {**online, **ahead}}, {"$limit": 1}, {"$count": "n"}],
+        }},
+    ]
+    facets = next(db.machines.aggregate(pipeline), {})
+    counts = {key: (rows[0]["n"] if rows else 0) for key, rows in facets.items()}
+    total_count = db.machines.estimated_document_count()
+
+    position = counts.get("ahead", 0) + 1
+    return (position, order_value, total_count, counts.get("online", 0),
+            counts.get("ahead_online", 0) > 0)
+
+def has_ahead_online(db, order_value: int, machine_id: str, scheduled_minute_utc: datetime) -> bool:
+    """이번 분에 하트비트를 남긴 앞순서 머신이 있는지 (복합 인덱스만으로 판정)"""
+    query = {"last_online_minute": scheduled_minute_utc, **build_ahead_filter(order_value, machine_id)}
+    # _id를 빼고 인덱스에 있는 machine_id만 받아 문서 fetch 없이(covered) 답할 수 있게 한다
+    return db.machines.find_one(query, {"_id": 0, "machine_id": 1}) is not None
+
+def watch_ahead_heartbeats(db, order_value: int, machine_id: str, scheduled_minute_utc: datetime,
+                           found_ev: threading.Event, stop_ev: threading.Event):
+    """order 대기 중 앞순서 머신의 이번 분 하트비트를 change stream으로 감지해 found_ev를 설정
+
+    스트림을 쓸 수 없거나(standalone) 열기 전에 들어온 하트비트는 대기 후 재확인에서 처리된다.
+    """
+    ahead = [{f"fullDocument.{k}": v for k, v in clause.items()}
+             for clause in build_ahead_filter(order_value, machine_id)["$or"]]
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]},
+                            "fullDocument.last_online_minute": scheduled_minute_utc,
+                            "$or": ahead}}]
+    try:
+        with db.machines.watch(pipeline, full_document="updateLookup", max_await_time_ms=500) as stream:
+            while not stop_ev.is_set():
+                if stream.try_next() is not None:
+                    found_ev.set()
+                    return
+    except PyMongoError:
+        return
 
 # -------------------- Mongo 연결/인덱스 --------------------
+@lru_cache(maxsize=4)
+def get_mongo_client(uri: str) -> MongoClient:
+    # 같은 URI면 커넥션 풀/토폴로지 탐색을 재사용 (reload_config로 URI가 바뀐 경우만 새 클라이언트)
+    return MongoClient(uri, appname=APP_NAME)
+
 def get_db():
     uri = CFG.get("mongodb_uri", "")
     if not uri:
         print("config.mongodb_uri가 필요합니다.", file=sys.stderr); sys.exit(1)
-    client = MongoClient(uri, appname=APP_NAME)
-    db = client[CFG.get("db_name", "fleetcron")]
+    return get_mongo_client(uri)[CFG.get("db_name", "fleetcron")]
+
+def ensure_indexes(db):
+    """에이전트 시작 시 한 번만 인덱스를 보장 (명령 전송 CLI 등에서는 생략)"""
     db.machines.create_index("machine_id", unique=True)
     for key in ORDER_FIELD_ALIASES:
         db.machines.create_index([(key, 1)])
-    db.machines.create_index("last_online_minute")
+        # 분 단위 온라인 필터 + order 범위 + 동률 machine_id를 한 인덱스에서 처리
+        db.machines.create_index([("last_online_minute", 1), (key, 1), ("machine_id", 1)])
+    try:
+        # 복합 인덱스로 대체된 단일 필드 인덱스 정리
+        db.machines.drop_index("last_online_minute_1")
+    except PyMongoError:
+        pass
     db.jobs.create_index([("enabled",1),("hour",1),("minute",1)])
     db.jobs.create_index([("enabled",1),("schedules.hour",1),("schedules.minute",1)])
     db.job_runs.create_index([("job_id",1),("scheduled_for",1)], unique=True)
-    db.commands.create_index([("target",1),("created_at",1)])
-    return db
+    db.job_runs.create_index([("end_at",1)])
+    db.commands.create_index([("target",1),("_id",1)])
+    try:
+        # (target, _id) 인덱스로 대체된 폴링용 인덱스 정리
+        db.commands.drop_index("target_1_created_at_1")
+    except PyMongoError:
+        pass
 
 # -------------------- 템플릿 해석 --------------------
+def _secret_value(m) -> str:
+    return SECRET_VALUES[m.group(1)]
+
 def resolve_templates(value):
+    # 시크릿이 없으면 dict/list를 재귀로 복사할 필요 없이 그대로 반환
+    if SECRET_PATTERN is None:
+        return value
     if isinstance(value, str):
-        out = value
-        for k, v in CFG.get("secrets", {}).items():
-            out = out.replace("{{"+k+"}}", str(v))
-        return out
+        if "{{" not in value:
+            return value
+        return SECRET_PATTERN.sub(_secret_value, value)
     if isinstance(value, dict):
         return {k: resolve_templates(v) for k,v in value.items()}
     if isinstance(value, list):
         return [resolve_templates(v) for v in value]
     return value
 
+def resolve_request_fields(step: Dict[str, Any]) -> Dict[str, Any]:
+    """HTTP 스텝의 url/headers/params/body 템플릿을 해석한다 (현재 시크릿 버전 표시 포함)"""
+    return {
+        "version": SECRET_VERSION,
+        "url": resolve_templates(step.get("url")),
+        "headers": resolve_templates(step.get("headers") or {}),
+        "params": resolve_templates(step.get("params") or {}),
+        "body": resolve_templates(step.get("body")),
+    }
+
 # -------------------- 잡 캐시 --------------------
+# 에이전트가 실제로 쓰는 잡 필드만 받아 설명/메타데이터 등 큰 필드의 전송·디코딩을 줄인다
+JOB_PROJECTION = {k: 1 for k in (
+    "name", "enabled", "hour", "minute", "schedules", "actions", "parallel", "parallelism",
+    "method", "url", "headers", "params", "body", "timeout_sec", "retry", "use_curl", "use_cloudscraper",
+)}
+
 class JobsCache:
     def __init__(self, db):
         self.db = db
-        self._map = {}
-        self._lock = threading.Lock()
+        # (정렬된 분 단위 틱 배열, 틱별 잡 목록)을 하나의 튜플로 교체해 읽기 경로에서 락을 쓰지 않는다
+        # 틱은 하루 중 분(hour*60+minute)으로 array('H')에 빽빽하게 저장한다
+        self._state: Tuple[array, List[List[Dict[str, Any]]]] = (array("H"), [])
+        # reload 때마다 설정되어 메인 루프의 대기를 깨운다
+        self.wakeup_ev = threading.Event()
+        # jobs 컬렉션 change stream이 동작 중이면 변경 시에만 reload하고 주기적 reload는 생략
+        self.watching = False
+        self._jobs: Dict[Any, Dict[str, Any]] = {}
+        # 쓰기 경로(reload/apply_change)만 직렬화한다. 읽기는 _state 스왑에 의존해 락 없이 한다
+        self._write_lock = threading.RLock()
         self.reload()
     
+    def reload_if_unwatched(self):
+        if not self.watching:
+            self.reload()
+    
     def _add_to(self, mp, j, hour, minute):
-        if hour is None:
-            for h in range(24):
-                key = (h, int(minute))
-                mp.setdefault(key, []).append(j)
+        # 범위를 벗어난 슬롯은 다른 시각의 틱으로 섞이거나 replace(hour=24)에서 죽으므로 버린다
+        try:
+            minute = int(minute)
+            hours = range(24) if hour is None else (int(hour),)
+        except (TypeError, ValueError):
+            hours = ()
+        if not hours or not (0 <= minute < 60) or not all(0 <= h < 24 for h in hours):
+            print(f"[jobs] 잘못된 스케줄 무시: {j.get('name', j.get('_id'))} hour={hour} minute={minute}",
+                  file=sys.stderr)
+            return
+        for h in hours:
+            mp.setdefault(h * 60 + minute, []).append(j)
+    
+    def _prepare(self, j):
+        # HTTP 기본값 병합도 로드 시 한 번 (reload_config는 기본값 갱신 후 잡을 다시 읽는다)
+        j["_http_defaults"] = build_job_defaults(j)
+        # 템플릿은 로드 시 한 번만 해석 (원본 필드는 화면 출력용으로 그대로 둔다)
+        if j.get("actions"):
+            for action in j["actions"]:
+                action["_resolved"] = resolve_request_fields(action)
+                prepare_when(action.get("when"))
         else:
-            key = (int(hour), int(minute))
-            mp.setdefault(key, []).append(j)
+            j["_resolved"] = resolve_request_fields(j)
+        return j
     
-    def reload(self):
+    def _rebuild(self):
+        # _write_lock을 잡은 상태에서만 호출된다
         mp = {}
-        for j in self.db.jobs.find({"enabled": True}):
+        for j in self._jobs.values():
             if "schedules" in j and j["schedules"]:
                 for sch in j["schedules"]:
                     self._add_to(mp, j, sch.get("hour"), sch.get("minute", 0))
             else:
                 self._add_to(mp, j, j.get("hour"), j.get("minute", 0))
-        with self._lock:
-            self._map = mp
-        total = sum(len(v) for v in mp.values())
+        ticks = sorted(mp)
+        self._state = (array("H", ticks), [mp[t] for t in ticks])
+        self.wakeup_ev.set()
+        return sum(len(v) for v in mp.values())
+    
+    def reload(self):
+        with self._write_lock:
+            self._jobs = {j["_id"]: self._prepare(j)
+                          for j in self.db.jobs.find({"enabled": True}, JOB_PROJECTION)}
+            total = self._rebuild()
         if USE_RICH:
             console.print(f"[green]✓[/green] Loaded {total} job schedules")
         else:
             print(f"✓ Loaded {total} job schedules")
     
+    def apply_change(self, change: Dict[str, Any]):
+        """change stream 이벤트 하나로 바뀐 잡만 교체하고 인덱스를 다시 만든다 (DB 재조회 없음)"""
+        op = change.get("operationType")
+        if op not in ("insert", "update", "replace", "delete"):
+            # drop/rename/invalidate 등은 전체를 다시 읽는다
+            self.reload()
+            return
+        job_id = change["documentKey"]["_id"]
+        doc = change.get("fullDocument")
+        with self._write_lock:
+            jobs = dict(self._jobs)
+            if op != "delete" and doc and doc.get("enabled") is True:
+                jobs[job_id] = self._prepare({k: v for k, v in doc.items() if k == "_id" or k in JOB_PROJECTION})
+            elif jobs.pop(job_id, None) is None:
+                return
+            self._jobs = jobs
+            self._rebuild()
+    
     def list_for(self, hour: int, minute: int) -> List[Dict[str,Any]]:
-        with self._lock:
-            return list(self._map.get((hour, minute), []))
+        ticks, buckets = self._state
+        tick = hour * 60 + minute
+        i = bisect.bisect_left(ticks, tick)
+        if i < len(ticks) and ticks[i] == tick:
+            return list(buckets[i])
+        return []
     
     def get_next_schedule(self, from_time: datetime) -> Optional[datetime]:
-        with self._lock:
-            if not self._map:
-                return None
-            
-            current_hour = from_time.hour
-            current_minute = from_time.minute
-            
-            for h in range(current_hour, 24):
-                for m in range(60):
-                    if h == current_hour and m <= current_minute:
-                        continue
-                    if (h, m) in self._map:
-                        next_time = from_time.replace(hour=h, minute=m, second=0, microsecond=0)
-                        return next_time
-            
-            for h in range(24):
-                for m in range(60):
-                    if (h, m) in self._map:
-                        next_time = from_time.replace(hour=h, minute=m, second=0, microsecond=0)
-                        next_time += timedelta(days=1)
-                        return next_time
-            
+        # 정렬된 틱 배열에서 이진 탐색으로 다음 스케줄을 찾는다
+        ticks, _ = self._state
+        if not ticks:
             return None
+        i = bisect.bisect_right(ticks, from_time.hour * 60 + from_time.minute)
+        h, m = divmod(ticks[i] if i < len(ticks) else ticks[0], 60)
+
+        next_time = from_time.replace(hour=h, minute=m, second=0, microsecond=0)
+        if i >= len(ticks):
+            next_time += timedelta(days=1)
+        return next_time
 
 
 class NotificationManager:
@@ -557,8 +776,6 @@ class NotificationManager:
 
         if not silent:
             failure = next((step for step in steps if step.get("status") not in {"ok", "skipped", "skipped_when", "skipped_unsupported"}), None)
-            if not failure:
-                failure = next((step for step in steps if step.get("status") == "error"), None)
             if failure:
                 err = failure.get("error") or failure.get("status") or "Unknown error"
                 attempts = failure.get("attempts")
@@ -569,37 +786,173 @@ class NotificationManager:
         message = "\n".join(lines)
         self.send_message(message, silent=silent)
 # -------------------- 명령 폴링 --------------------
-def commands_watcher(db, machine_id: str, jobs_cache: JobsCache, stop_ev: threading.Event, notifier: Optional[NotificationManager] = None):
-    last_seen = datetime.now(timezone.utc) - timedelta(seconds=1)
+COMMAND_POLL_INTERVAL_SEC = 5.0
+# 폴링 모드: 명령이 없으면 간격을 1.5배씩 늘리고(최대 30초), 명령을 받으면 1초로 되돌린다
+COMMAND_POLL_MIN_SEC = 1.0
+COMMAND_POLL_MAX_SEC = 30.0
+# ObjectId 시각은 보낸 머신의 시계 기준이라 단조 증가를 믿지 않고, 최근 구간을 매번 다시 읽어 _id로 중복을 거른다
+COMMAND_POLL_LOOKBACK_SEC = 60.0
+
+def handle_command(cmd: Dict[str, Any], jobs_cache: JobsCache, notifier: Optional[NotificationManager] = None):
+    """commands 컬렉션에서 받은 명령 하나를 처리"""
+    global CFG, CRON_TZ, ACTUAL_TZ_NAME
+    if cmd.get("type") == "reload_jobs":
+        jobs_cache.reload()
+        if USE_RICH:
+            console.print("[green]✓[/green] Jobs reloaded")
+        else:
+            print("✓ Jobs reloaded")
+    elif cmd.get("type") == "reload_config":
+        CFG = load_config()
+        refresh_order_settings()
+        refresh_secret_templates()
+        refresh_http_defaults()
+        setup_timezone()
+        jobs_cache.reload()
+        if notifier:
+            notifier.reload()
+        if USE_RICH:
+            console.print("[green]✓[/green] Config reloaded")
+        else:
+            print("✓ Config reloaded")
+
+def watch_commands_stream(db, machine_id: str, jobs_cache: JobsCache, stop_ev: threading.Event,
+                          notifier: Optional[NotificationManager] = None):
+    """change stream으로 새 명령을 서버 푸시로 받는다 (replica set 필요)"""
+    pipeline = [{"$match": {"operationType": "insert",
+                            "fullDocument.target": {"$in": [machine_id, "all"]}}}]
+    resume_token = None
+    while not stop_ev.is_set():
+        try:
+            stream = db.commands.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000)
+        except OperationFailure as e:
+            if resume_token is None:
+                # 여는 단계에서 실패하면 change stream 미지원으로 보고 폴링으로 전환
+                raise
+            # 재개 토큰이 만료된 경우(ChangeStreamHistoryLost 등)는 현재 시점부터 다시 연다
+            print("[cmd] change stream 재개 실패, 처음부터 다시 연결:", e, file=sys.stderr)
+            resume_token = None
+            continue
+        except Exception as e:
+            print("[cmd] change stream 오류:", e, file=sys.stderr)
+            stop_ev.wait(COMMAND_POLL_INTERVAL_SEC)
+            continue
+        try:
+            with stream:
+                # drop/rename 등으로 무효화되면 커서가 닫히므로 빠져나와 다시 연다
+                while stream.alive and not stop_ev.is_set():
+                    change = stream.try_next()
+                    if change is not None:
+                        try:
+                            handle_command(change["fullDocument"], jobs_cache, notifier)
+                        except Exception as e:
+                            print("[cmd] 명령 처리 오류:", e, file=sys.stderr)
+                    # 빈 배치도 post-batch 토큰을 주므로 매번 저장해 재연결 사이의 명령을 놓치지 않는다
+                    resume_token = stream.resume_token
+            if not stop_ev.is_set():
+                # 무효화 이벤트의 토큰으로는 resume_after를 쓸 수 없으므로 현재 시점부터 다시 연다
+                resume_token = None
+        except Exception as e:
+            print("[cmd] change stream 오류:", e, file=sys.stderr)
+            stop_ev.wait(COMMAND_POLL_INTERVAL_SEC)
+
+def poll_commands(db, machine_id: str, jobs_cache: JobsCache, stop_ev: threading.Event,
+                  notifier: Optional[NotificationManager] = None):
+    """change stream을 쓸 수 없는 standalone 서버용 주기적 폴링"""
+    started = datetime.now(timezone.utc) - timedelta(seconds=1)
+    seen = set()
+    idle_delay = COMMAND_POLL_MIN_SEC
     while not stop_ev.is_set():
+        got = False
+        # (target, _id) 인덱스 범위 스캔. 시작 이전 명령은 읽지 않는다
+        floor = max(started, datetime.now(timezone.utc) - timedelta(seconds=COMMAND_POLL_LOOKBACK_SEC))
+        floor_id = ObjectId.from_datetime(floor)
         try:
             cur = db.commands.find({
                 "target": {"$in": [machine_id, "all"]},
-                "created_at": {"$gt": last_seen}
-            }).sort("created_at", 1)
+                "_id": {"$gte": floor_id}
+            }).sort("_id", 1)
             for cmd in cur:
-                last_seen = cmd["created_at"]
-                if cmd.get("type") == "reload_jobs":
-                    jobs_cache.reload()
-                    if USE_RICH:
-                        console.print("[green]✓[/green] Jobs reloaded")
-                    else:
-                        print("✓ Jobs reloaded")
-                elif cmd.get("type") == "reload_config":
-                    global CFG, CRON_TZ, ACTUAL_TZ_NAME
-                    CFG = load_config()
-                    refresh_order_settings()
-                    setup_timezone()
-                    jobs_cache.reload()
-                    if notifier:
-                        notifier.reload()
-                    if USE_RICH:
-                        console.print("[green]✓[/green] Config reloaded")
-                    else:
-                        print("✓ Config reloaded")
+                if cmd["_id"] in seen:
+                    continue
+                seen.add(cmd["_id"])
+                got = True
+                handle_command(cmd, jobs_cache, notifier)
+            # 구간 밖으로 밀려난 _id는 다시 조회되지 않으므로 잊는다
+            seen = {i for i in seen if i >= floor_id}
         except Exception as e:
             print("[cmd] watcher 오류:", e, file=sys.stderr)
-        stop_ev.wait(5.0)
+        idle_delay = COMMAND_POLL_MIN_SEC if got else min(COMMAND_POLL_MAX_SEC, idle_delay * 1.5)
+        stop_ev.wait(idle_delay)
+
+def commands_watcher(db, machine_id: str, jobs_cache: JobsCache, stop_ev: threading.Event, notifier: Optional[NotificationManager] = None):
+    try:
+        watch_commands_stream(db, machine_id, jobs_cache, stop_ev, notifier)
+    except OperationFailure as e:
+        print(f"[cmd] change stream 사용 불가, 폴링으로 전환: {e}", file=sys.stderr)
+        poll_commands(db, machine_id, jobs_cache, stop_ev, notifier)
+
+def jobs_watcher(db, jobs_cache: JobsCache, stop_ev: threading.Event):
+    """jobs 컬렉션 변경을 change stream으로 받아 바뀐 잡만 캐시에 반영 (standalone 서버면 주기적 reload 유지)"""
+    while not stop_ev.is_set():
+        try:
+            stream = db.jobs.watch(full_document="updateLookup", max_await_time_ms=1000)
+        except OperationFailure as e:
+            # 스트림을 여는 단계의 실패만 "지원 안 함"으로 보고 폴백한다
+            print(f"[jobs] change stream 사용 불가, 매 분 reload 유지: {e}", file=sys.stderr)
+            return
+        except Exception as e:
+            print("[jobs] change stream 오류:", e, file=sys.stderr)
+            stop_ev.wait(COMMAND_POLL_INTERVAL_SEC)
+            continue
+        try:
+            with stream:
+                # 스트림을 연 뒤 한 번 읽어 그 사이의 변경을 놓치지 않는다
+                jobs_cache.reload()
+                jobs_cache.watching = True
+                # drop/rename 등으로 무효화되면 커서가 닫히므로 빠져나와 다시 연다
+                while stream.alive and not stop_ev.is_set():
+                    change = stream.try_next()
+                    if change is not None:
+                        jobs_cache.apply_change(change)
+        except Exception as e:
+            print("[jobs] change stream 오류:", e, file=sys.stderr)
+            stop_ev.wait(COMMAND_POLL_INTERVAL_SEC)
+        finally:
+            jobs_cache.watching = False
+
+# -------------------- job_runs 보관 --------------------
+ARCHIVE_CHECK_INTERVAL_SEC = 3600
+
+def archive_old_job_runs(db, retention_days: int) -> int:
+    """retention_days보다 오래된 완료 실행 기록을 job_runs_history로 옮기고 옮긴 개수를 반환"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    old = {"end_at": {"$lt": cutoff}}
+    # 서버 안에서 $merge로 복사해 문서를 에이전트로 가져오지 않는다
+    db.job_runs.aggregate([{"$match": old},
+                           {"$merge": {"into": "job_runs_history", "whenMatched": "keepExisting"}}])
+    return db.job_runs.delete_many(old).deleted_count
+
+def job_runs_archiver(db, machine_id: str, stop_ev: threading.Event):
+    """하루 한 번, 먼저 잠금을 잡은 머신 하나가 오래된 job_runs를 보관 컬렉션으로 옮긴다"""
+    while not stop_ev.is_set():
+        retention_days = int(CFG.get("job_runs_retention_days", 0))
+        if retention_days > 0:
+            now = datetime.now(timezone.utc)
+            try:
+                # 기한이 지났거나 문서가 없으면 차지한다. 기한 전이면 업서트가 _id 중복으로 실패한다
+                db.maintenance.find_one_and_update(
+                    {"_id": "job_runs_archive", "next_run_at": {"$lte": now}},
+                    {"$set": {"next_run_at": now + timedelta(days=1), "holder": machine_id}},
+                    upsert=True)
+                moved = archive_old_job_runs(db, retention_days)
+                if moved:
+                    print(f"[archive] job_runs {moved}건을 job_runs_history로 이동")
+            except DuplicateKeyError:
+                pass
+            except PyMongoError as e:
+                print("[archive] 오류:", e, file=sys.stderr)
+        stop_ev.wait(ARCHIVE_CHECK_INTERVAL_SEC)
 
 # -------------------- 시간 유틸/하트비트 --------------------
 def floor_to_minute(dt: datetime) -> datetime: 
@@ -608,33 +961,28 @@ def floor_to_minute(dt: datetime) -> datetime:
 def to_utc_minute(dt_local_minute: datetime) -> datetime: 
     return dt_local_minute.astimezone(timezone.utc)
 
-def update_heartbeat(db, machine_id: str, scheduled_minute_utc: datetime):
+def update_heartbeat(db, machine_id: str, scheduled_minute_utc: datetime) -> Optional[Dict[str, Any]]:
+    """하트비트를 기록하고 갱신된 머신 문서(order 필드만)를 반환"""
     now = datetime.now(timezone.utc)
-    db.machines.update_one({"machine_id": machine_id},
-        {"$set": {"last_online_minute": scheduled_minute_utc, "last_seen": now}})
-
-def check_earlier_machines_online(machines_sorted: List[Dict[str, Any]], my_position: int,
-                                   scheduled_minute_utc: datetime) -> bool:
-    """내 앞 순번 머신들이 이번 분에 온라인인지 확인"""
-    if my_position <= 1:
-        return False
-    
-    # 내 앞 순번들 확인 (1부터 my_position-1까지)
-    for idx, m in enumerate(machines_sorted, 1):
-        if idx >= my_position:
-            break  # 내 순번에 도달
-        
-        # 이 머신이 현재 분에 활동했는지 확인
-        if m.get("last_online_minute") == scheduled_minute_utc:
-            return True  # 앞 순번이 살아있음
-    
-    return False  # 앞 순번들이 모두 죽었거나 활동 안함
+    return db.machines.find_one_and_update(
+        {"machine_id": machine_id},
+        {"$set": {"last_online_minute": scheduled_minute_utc, "last_seen": now}},
+        projection={key: 1 for key in ORDER_FIELD_ALIASES},
+        return_document=ReturnDocument.AFTER)
 
 # -------------------- 클레임 --------------------
-def claim_job_run(db, job, scheduled_minute_utc, machine_id, order_value: int, order_position: int):
+def claim_job_runs(db, jobs: List[Dict[str,Any]], scheduled_minute_utc, machine_id,
+                   order_value: int, order_position: int) -> List[bool]:
+    """같은 분의 잡들을 한 번의 bulk_write로 클레임하고 잡별 성공 여부를 반환
+
+    다른 머신이 이미 클레임한 잡은 필터가 맞지 않아 업서트가 유니크 인덱스에 걸리므로
+    (DuplicateKey) 해당 op 인덱스만 실패로 처리한다.
+    """
+    if not jobs:
+        return []
     now = datetime.now(timezone.utc)
-    try:
-        doc = db.job_runs.find_one_and_update(
+    ops = [
+        UpdateOne(
             {
                 "job_id": job["_id"], "scheduled_for": scheduled_minute_utc,
                 "$or": [{"claimed_by": None}, {"claimed_by": machine_id}]
@@ -646,17 +994,27 @@ def claim_job_run(db, job, scheduled_minute_utc, machine_id, order_value: int, o
                        "executed_order_position": order_position,
                        "status": "running",
                        "steps": []}},
-            upsert=True, return_document=ReturnDocument.AFTER
+            upsert=True
         )
-        return doc and doc.get("claimed_by") == machine_id
-    except DuplicateKeyError:
-        return False
+        for job in jobs
+    ]
+    claimed = [True] * len(jobs)
+    try:
+        db.job_runs.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            claimed[err["index"]] = False
+            if err.get("code") != 11000:
+                print("[claim] DB 오류:", err.get("errmsg"), file=sys.stderr)
     except PyMongoError as e:
-        print("[claim] DB 오류:", e, file=sys.stderr); return False
+        print("[claim] DB 오류:", e, file=sys.stderr)
+        return [False] * len(jobs)
+    return claimed
 
 # -------------------- HTTP 실행 + 리트라이 --------------------
+@lru_cache(maxsize=1)
 def get_ssl_verify_path():
-    """SSL 인증서 경로 결정"""
+    """SSL 인증서 경로 결정 (프로세스당 한 번만 파일 시스템을 확인하고 결과를 재사용)"""
     if HAS_CERTIFI:
         ca_path = certifi.where()
         if os.path.exists(ca_path):
@@ -675,8 +1033,83 @@ def get_ssl_verify_path():
     
     return True  # 기본값
 
-def execute_curl_request(url: str, headers: Dict, params: Dict, timeout: int, retries: int, delay: float):
+def read_response_sample(resp) -> str:
+    """응답 본문 앞부분(RESP_SAMPLE_MAX)만 디코딩해 반환한다.
+
+    stream=True 응답은 나머지 본문을 버리면서 읽어 커넥션을 풀로 돌려보낸다.
+    """
+    if not hasattr(resp, "iter_content"):
+        return (getattr(resp, "text", "") or "")[:RESP_SAMPLE_MAX]
+    # 청크 하나는 네트워크 읽기 한 번일 수 있으므로 한도까지 모은 뒤 나머지는 버린다
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size=RESP_SAMPLE_MAX):
+        if len(buf) < RESP_SAMPLE_MAX:
+            buf += chunk[:RESP_SAMPLE_MAX - len(buf)]
+    return bytes(buf).decode(resp.encoding or "utf-8", errors="replace")[:RESP_SAMPLE_MAX]
+
+class CurlResponse:
+    """curl 실행 결과를 requests 응답처럼 다루기 위한 최소 객체"""
+    __slots__ = ("status_code", "text")
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+# curl -v 출력의 응답 상태 줄
+CURL_STATUS_RE = re.compile(r'< HTTP/[\d\.]+ (\d+)')
+
+def curl_request_headers(headers: Dict) -> List[str]:
+    return [
+        f"User-Agent: {headers.get('User-Agent', 'Mozilla/5.0')}",
+        f"Accept: {headers.get('Accept', '*/*')}",
+        f"Accept-Language: {headers.get('Accept-Language', 'en-US,en;q=0.9')}",
+        f"Upgrade-Insecure-Requests: {headers.get('Upgrade-Insecure-Requests', '1')}",
+    ]
+
+# curl --retry가 일시적 오류로 보고 재시도하는 HTTP 상태 코드
+CURL_RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+def execute_pycurl_request(url: str, headers: Dict, timeout: int, retries: int, delay: float) -> Tuple[int, str]:
+    """libcurl을 프로세스 안에서 호출 (curl 실행/출력 파싱 없이 상태 코드를 직접 읽음)"""
+    ca_path = get_ssl_verify_path()
+    attempt = 0
+    while True:
+        attempt += 1
+        buf = BytesIO()
+        c = pycurl.Curl()
+        try:
+            c.setopt(pycurl.URL, url)
+            c.setopt(pycurl.HTTPHEADER, curl_request_headers(headers))
+            c.setopt(pycurl.TIMEOUT, int(timeout))
+            c.setopt(pycurl.FOLLOWLOCATION, False)
+            c.setopt(pycurl.WRITEDATA, buf)
+            if ca_path and ca_path != True and os.path.exists(str(ca_path)):
+                c.setopt(pycurl.CAINFO, str(ca_path))
+            c.perform()
+            status_code = c.getinfo(pycurl.RESPONSE_CODE)
+        except pycurl.error:
+            # curl --retry-all-errors와 같이 전송 오류는 retries 횟수만큼 재시도
+            if attempt > retries:
+                raise
+            time.sleep(delay)
+            continue
+        finally:
+            c.close()
+        if status_code in CURL_RETRY_STATUS and attempt <= retries:
+            time.sleep(delay)
+            continue
+        return status_code, buf.getvalue().decode("utf-8", errors="replace")
+
+def execute_curl_request(url: str, headers: Dict, params: Dict, timeout: int, retries: int, delay: float) -> "CurlResponse":
     """curl 명령 실행 헬퍼 함수"""
+    if USE_PYCURL:
+        status_code, output = execute_pycurl_request(url, headers, timeout, retries, delay)
+    else:
+        status_code, output = execute_curl_process(url, headers, timeout, retries, delay)
+    return CurlResponse(status_code, output)
+
+def execute_curl_process(url: str, headers: Dict, timeout: int, retries: int, delay: float) -> Tuple[int, str]:
+    """pycurl이 없을 때 시스템 curl을 실행하고 -v 출력에서 상태 코드를 읽는다"""
     curl_paths = [
         shutil.which("curl"),
         "/usr/bin/curl",
@@ -696,12 +1129,8 @@ def execute_curl_request(url: str, headers: Dict, params: Dict, timeout: int, re
     cmd = [curl_cmd, "-v", "-i"]
     cmd.append(url)
     
-    cmd.extend([
-        "-H", f"User-Agent: {headers.get('User-Agent', 'Mozilla/5.0')}",
-        "-H", f"Accept: {headers.get('Accept', '*/*')}",
-        "-H", f"Accept-Language: {headers.get('Accept-Language', 'en-US,en;q=0.9')}",
-        "-H", f"Upgrade-Insecure-Requests: {headers.get('Upgrade-Insecure-Requests', '1')}"
-    ])
+    for header in curl_request_headers(headers):
+        cmd.extend(["-H", header])
     
     # SSL 인증서 경로 추가
     ca_path = get_ssl_verify_path()
@@ -716,86 +1145,89 @@ def execute_curl_request(url: str, headers: Dict, params: Dict, timeout: int, re
     ])
     
     result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout*(retries+1)+30)
-    output = result.stdout + result.stderr
-    
-    import re
-    match = re.search(r'< HTTP/[\d\.]+ (\d+)', output)
+    # -v 헤더는 stderr에 찍히므로 먼저 보고, 없을 때만 stdout을 본다
+    match = CURL_STATUS_RE.search(result.stderr) or CURL_STATUS_RE.search(result.stdout)
     status_code = int(match.group(1)) if match else 0
-    
-    class FakeResponse:
-        def __init__(self, status, text):
-            self.status_code = status
-            self.text = text
-    
-    return FakeResponse(status_code, output)
+    return status_code, result.stdout + result.stderr
+
+# 여러 에이전트가 같은 URL을 같은 박자로 재시도하지 않도록 기본은 full jitter, 대기 상한 30초
+# (max_delay_sec: null이면 상한 없음, jitter: "none"이면 고정 간격)
+DEFAULT_RETRY_JITTER = "full"
+DEFAULT_RETRY_MAX_DELAY_SEC = 30.0
+
+def retry_sleep_seconds(delay: float, jitter: str) -> float:
+    """retry.jitter에 따른 실제 대기 시간 (full: 0~delay, equal: delay/2~delay, 그 외: delay 그대로)"""
+    if jitter == "full":
+        return random.uniform(0, delay)
+    if jitter == "equal":
+        return delay / 2 + random.uniform(0, delay / 2)
+    return delay
 
 def run_http_with_retry_with_progress(step: Dict[str,Any], defaults: Dict[str,Any]) -> Tuple[str, Dict[str,Any]]:
     """진행 상황을 표시하는 HTTP 실행 함수"""
     action_name = step.get("name", step.get("url", "HTTP Request"))
     
-    timeout = step.get("timeout_sec", defaults.get("timeout_sec", 10))
+    # 단일 요청 잡은 step에 timeout_sec=None을 넣어 넘기므로 None도 기본값으로 대체
+    timeout = step.get("timeout_sec") or defaults.get("timeout_sec", 10)
     rdef = defaults.get("retry", {}) or {}
     rcfg = step.get("retry", {}) or {}
     retries = int(rcfg.get("retries", rdef.get("retries", 0)))
     delay   = float(rcfg.get("delay_sec", rdef.get("delay_sec", 0)))
     backoff = float(rcfg.get("backoff", rdef.get("backoff", 1.0)))
+    jitter  = str(rcfg.get("jitter", rdef.get("jitter", DEFAULT_RETRY_JITTER))).lower()
+    max_delay = rcfg.get("max_delay_sec", rdef.get("max_delay_sec", DEFAULT_RETRY_MAX_DELAY_SEC))
+    max_delay = float(max_delay) if max_delay is not None else None
 
     method = str(step.get("method","GET")).upper()
-    url    = resolve_templates(step.get("url"))
-    headers= resolve_templates(step.get("headers") or {})
-    params = resolve_templates(step.get("params") or {})
-    body   = resolve_templates(step.get("body"))
+    resolved = step.get("_resolved")
+    if not resolved or resolved.get("version") != SECRET_VERSION:
+        resolved = resolve_request_fields(step)
+    url    = resolved["url"]
+    headers= resolved["headers"]
+    params = resolved["params"]
+    body   = resolved["body"]
+
+    # 요청 경로와 인자는 재시도마다 같으므로 루프 전에 한 번만 결정
+    use_curl = step.get("use_curl", False) and method == "GET"
+    use_cloudscraper = USE_CLOUDSCRAPER and (step.get("use_cloudscraper", False) or "render.com" in (url or "").lower())
+    send = get_scraper().request if use_cloudscraper else HTTP_SESSION.request
+    kwargs = dict(headers=headers, params=params, timeout=timeout, verify=get_ssl_verify_path(), stream=True)
+    if method in ("POST","PUT","PATCH","DELETE"):
+        if isinstance(body, (dict, list)):
+            kwargs["json"] = body
+        elif body is not None:
+            kwargs["data"] = body
     
     attempts = 0
     last_info = {}
-    total_start = time.time()
+    total_start = time.monotonic()
 
     while True:
         attempts += 1
-        start = time.time()
+        start = time.monotonic()
+        last_exc = None
 
         if attempts > 1:
-            print_action_progress(action_name, "retrying", int((time.time()-total_start)*1000), attempts, retries+1)
+            print_action_progress(action_name, "retrying", int((time.monotonic()-total_start)*1000), attempts, retries+1)
         else:
             print_action_progress(action_name, "running", 0)
 
         resp = None
-        scraper = None
 
         try:
-            use_curl = step.get("use_curl", False)
-            use_cloudscraper = step.get("use_cloudscraper", False) or "render.com" in url.lower()
-
-            if use_curl and method == "GET":
+            if use_curl:
                 resp = execute_curl_request(url, headers, params, timeout, retries, delay)
-            elif USE_CLOUDSCRAPER and use_cloudscraper:
-                scraper = cloudscraper.create_scraper()
-                for k, v in headers.items():
-                    scraper.headers[k] = v
-                kwargs = dict(params=params, timeout=timeout, verify=get_ssl_verify_path())
-                if method in ("POST","PUT","PATCH","DELETE"):
-                    if isinstance(body, (dict, list)):
-                        kwargs["json"] = body
-                    elif body is not None:
-                        kwargs["data"] = body
-                resp = scraper.request(method, url, **kwargs)
             else:
-                kwargs = dict(headers=headers, params=params, timeout=timeout, verify=get_ssl_verify_path())
-                if method in ("POST","PUT","PATCH","DELETE"):
-                    if isinstance(body, (dict, list)):
-                        kwargs["json"] = body
-                    elif body is not None:
-                        kwargs["data"] = body
-                resp = HTTP_SESSION.request(method, url, **kwargs)
+                resp = send(method, url, **kwargs)
 
-            elapsed = int((time.time()-start)*1000)
+            response_sample = read_response_sample(resp)
+            elapsed = int((time.monotonic()-start)*1000)
 
             status_code = getattr(resp, "status_code", 0)
-            resp_text = getattr(resp, "text", "")
             info = {
                 "status_code": status_code,
                 "elapsed_ms": elapsed,
-                "response_sample": (resp_text or "")[:RESP_SAMPLE_MAX]
+                "response_sample": response_sample
             }
 
             if 200 <= status_code < 300:
@@ -805,7 +1237,7 @@ def run_http_with_retry_with_progress(step: Dict[str,Any], defaults: Dict[str,An
                 last_info = {"error": f"HTTP {status_code}", **info}
 
         except Exception as e:
-            elapsed = int((time.time()-start)*1000)
+            elapsed = int((time.monotonic()-start)*1000)
             error_msg = str(e)
 
             # SSL 오류 상세 정보
@@ -814,45 +1246,164 @@ def run_http_with_retry_with_progress(step: Dict[str,Any], defaults: Dict[str,An
                 if HAS_CERTIFI:
                     error_msg += f"\n  Certifi Location: {certifi.where()}"
 
-            last_info = {"error": error_msg, "elapsed_ms": elapsed,
-                         "trace": traceback.format_exc()[:2000]}
+            last_info = {"error": error_msg, "elapsed_ms": elapsed}
+            last_exc = e
         finally:
-            if scraper is not None:
-                try:
-                    scraper.close()
-                except Exception:
-                    pass
             safe_close_response(resp)
 
         if attempts > retries:
             last_info["attempts"] = attempts
+            if last_exc is not None and CFG.get("debug"):
+                # 스택 트레이스는 debug 설정일 때, 실제로 반환되는 마지막 실패에서만 포맷
+                trace = traceback.format_exception(type(last_exc), last_exc, last_exc.__traceback__)
+                last_info["trace"] = "".join(trace)[:2000]
             return "error", last_info
 
         if delay > 0:
-            for i in range(int(delay)):
-                time.sleep(1)
-                remaining = int(delay - i - 1)
-                if USE_RICH and remaining > 0:
-                    console.print(f"    ⏱️ [dim]Waiting {remaining}s before retry...[/dim]", end="\r")
-            if delay % 1 > 0:
-                time.sleep(delay % 1)
+            sleep_sec = retry_sleep_seconds(delay, jitter)
+            # 첫 대기를 포함해 매번 jitter 적용 후의 값을 상한으로 자른다
+            if max_delay is not None:
+                sleep_sec = min(sleep_sec, max_delay)
+            # 초 단위로 깨어나며 카운트다운을 찍지 않고 한 번에 대기 (워커 스레드에서도 출력이 섞이지 않음)
+            if USE_RICH and sleep_sec >= 1:
+                console.print(f"    ⏱️ [dim]Waiting {sleep_sec:.0f}s before retry...[/dim]")
+            time.sleep(sleep_sec)
 
         delay = delay * backoff if backoff > 1 else delay
-
-def run_http_with_retry(step: Dict[str,Any], defaults: Dict[str,Any]) -> Tuple[str, Dict[str,Any]]:
-    # 진행 표시 없는 버전 (이전 버전과 동일하게 동작)
-    return run_http_with_retry_with_progress(step, defaults)
+        if max_delay is not None:
+            delay = min(delay, max_delay)
 
 # -------------------- when 조건 --------------------
 def when_match(when: Optional[Dict[str,Any]], now_local: datetime) -> bool:
     if not when: return True
-    if "hour_in" in when and now_local.hour not in set(when["hour_in"]): return False
-    if "minute_in" in when and now_local.minute not in set(when["minute_in"]): return False
+    hours = when.get("_hour_set")
+    if hours is None and "hour_in" in when: hours = set(when["hour_in"])
+    if hours is not None and now_local.hour not in hours: return False
+    minutes = when.get("_minute_set")
+    if minutes is None and "minute_in" in when: minutes = set(when["minute_in"])
+    if minutes is not None and now_local.minute not in minutes: return False
     return True
 
+def prepare_when(when: Optional[Dict[str,Any]]):
+    """잡 로드 시 hour_in/minute_in을 frozenset으로 미리 만들어 둔다 (매 분 set 재생성 방지)"""
+    if not when: return
+    if "hour_in" in when: when["_hour_set"] = frozenset(when["hour_in"])
+    if "minute_in" in when: when["_minute_set"] = frozenset(when["minute_in"])
+
 # -------------------- 액션 체인 실행 --------------------
-def execute_actions(db, run_key: Dict[str,Any], job: Dict[str,Any], now_local: datetime,
-                    job_defaults: Dict[str,Any]):
+DEFAULT_ACTION_PARALLELISM = 4
+# job_runs.steps에는 기록하지 않는 스텝 상태
+SKIPPED_STEP_STATUSES = ("skipped_when", "skipped_unsupported")
+
+def build_job_defaults(job: Dict[str,Any]) -> Dict[str,Any]:
+    """잡 단위 HTTP 기본값 (잡 로드 시 한 번 만들어 _http_defaults로 캐시, 모든 스텝에 공유)"""
+    return {**HTTP_DEFAULTS,
+            "timeout_sec": job.get("timeout_sec", HTTP_DEFAULT_TIMEOUT),
+            "retry": job.get("retry", HTTP_DEFAULT_RETRY)}
+
+def build_step_log(idx: int, action_name: str, st: str, info: Dict[str,Any]) -> Dict[str,Any]:
+    """HTTP 실행 결과를 job_runs.steps에 기록할 형태로 변환"""
+    s = {"index": idx, "name": action_name, "status": st}
+    if st == "ok":
+        s.update({"status_code": info.get("status_code"), "elapsed_ms": info.get("elapsed_ms"),
+                  "attempts": info.get("attempts"), "response_sample": info.get("response_sample")})
+    else:
+        s.update({"error": info.get("error"), "elapsed_ms": info.get("elapsed_ms"),
+                  "attempts": info.get("attempts"), "status_code": info.get("status_code")})
+        if info.get("trace"):
+            s["trace"] = info["trace"]
+    return s
+
+def step_dependencies(step: Dict[str,Any], name_to_idx: Dict[str,int]) -> set:
+    """step.depends_on(인덱스 또는 액션 이름, 단일 값 또는 리스트)을 액션 인덱스 집합으로 변환"""
+    raw = step.get("depends_on")
+    if raw is None:
+        return set()
+    if not isinstance(raw, list):
+        raw = [raw]
+    out = set()
+    for ref in raw:
+        if isinstance(ref, int):
+            out.add(ref)
+        elif ref in name_to_idx:
+            out.add(name_to_idx[ref])
+    return out
+
+def execute_actions_parallel(job: Dict[str,Any], now_local: datetime, defaults: Dict[str,Any]):
+    """job.parallel=true인 경우 HTTP 액션들을 스레드 풀에서 동시에 실행 (depends_on이 있으면 선행 액션 성공 후 실행)"""
+    actions = job.get("actions", [])
+    total_actions = len(actions)
+    steps_by_index: Dict[int, Dict[str,Any]] = {}
+    pending = []
+
+    for idx, step in enumerate(actions):
+        action_name = step.get("name", step.get("url", "(unnamed action)"))
+        print_action_start(action_name, idx, total_actions, step)
+
+        if step.get("type","http") != "http":
+            print_action_progress(action_name, "skipped")
+            steps_by_index[idx] = {"index":idx,"name":action_name,"status":"skipped_unsupported"}
+        elif not when_match(step.get("when"), now_local):
+            print_action_progress(action_name, "skipped")
+            steps_by_index[idx] = {"index":idx,"name":action_name,"status":"skipped_when"}
+        else:
+            pending.append((idx, action_name, step))
+
+    status_overall = "ok"
+    successful_actions = 0
+    if pending:
+        pending_idx = {idx for idx, _, _ in pending}
+        name_to_idx = {a.get("name"): i for i, a in enumerate(actions) if a.get("name")}
+        # 실행 대상이 아닌(건너뛴) 액션에 대한 의존은 충족된 것으로 본다
+        deps = {idx: step_dependencies(step, name_to_idx) & pending_idx for idx, _, step in pending}
+        succeeded, failed = set(), set()
+        waiting = list(pending)
+        workers = max(1, min(len(pending), int(job.get("parallelism", DEFAULT_ACTION_PARALLELISM))))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while waiting or running:
+                for item in list(waiting):
+                    idx, action_name, step = item
+                    if deps[idx] & failed:
+                        waiting.remove(item)
+                        failed.add(idx)
+                        print_action_progress(action_name, "skipped")
+                        steps_by_index[idx] = {"index":idx,"name":action_name,"status":"skipped_dependency"}
+                        if not step.get("continue_on_failure", False):
+                            status_overall = "error"
+                    elif deps[idx] <= succeeded:
+                        waiting.remove(item)
+                        running[pool.submit(run_http_with_retry_with_progress, step, defaults)] = item
+                if not running:
+                    # 순환 의존 등으로 더 이상 실행할 수 없는 액션
+                    for idx, action_name, step in waiting:
+                        print_action_progress(action_name, "skipped")
+                        steps_by_index[idx] = {"index":idx,"name":action_name,"status":"skipped_dependency"}
+                    if waiting:
+                        status_overall = "error"
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    idx, action_name, step = running.pop(fut)
+                    st, info = fut.result()
+                    print_action_progress(action_name, st, info.get("elapsed_ms", 0), info.get("attempts", 1))
+                    if st == "ok":
+                        successful_actions += 1
+                        succeeded.add(idx)
+                    else:
+                        failed.add(idx)
+                        if not step.get("continue_on_failure", False):
+                            status_overall = "error"
+                    steps_by_index[idx] = build_step_log(idx, action_name, st, info)
+
+    steps_log = [steps_by_index[idx] for idx in sorted(steps_by_index)]
+    return status_overall, steps_log, successful_actions
+
+def execute_actions(job: Dict[str,Any], now_local: datetime, job_defaults: Dict[str,Any]):
+    """액션 체인 실행. 스텝 결과는 DB에 바로 쓰지 않고 모아서 반환한다 (작업 종료 시 한 번에 기록)"""
+    if job.get("parallel"):
+        return execute_actions_parallel(job, now_local, job_defaults)
+
     steps_log = []
     status_overall = "ok"
     actions = job.get("actions", [])
@@ -874,9 +1425,7 @@ def execute_actions(db, run_key: Dict[str,Any], job: Dict[str,Any], now_local: d
             steps_log.append({"index":idx,"name":action_name,"status":"skipped_when"})
             continue
 
-        st, info = run_http_with_retry_with_progress(step, {**CFG.get("http_defaults",{}),
-                                              "timeout_sec": job.get("timeout_sec", CFG.get("http_defaults",{}).get("timeout_sec",10)),
-                                              "retry": job.get("retry", CFG.get("http_defaults",{}).get("retry",{}))})
+        st, info = run_http_with_retry_with_progress(step, job_defaults)
         
         if st == "ok":
             print_action_progress(action_name, "ok", info.get("elapsed_ms", 0), info.get("attempts", 1))
@@ -884,35 +1433,154 @@ def execute_actions(db, run_key: Dict[str,Any], job: Dict[str,Any], now_local: d
         else:
             print_action_progress(action_name, "error", info.get("elapsed_ms", 0), info.get("attempts", 1))
             
-        s = {"index": idx, "name": action_name, "status": st}
-        if st=="ok":
-            s.update({"status_code": info.get("status_code"), "elapsed_ms": info.get("elapsed_ms"),
-                      "attempts": info.get("attempts"), "response_sample": info.get("response_sample")})
-        else:
-            s.update({"error": info.get("error"), "elapsed_ms": info.get("elapsed_ms"),
-                      "attempts": info.get("attempts"), "status_code": info.get("status_code")})
+        s = build_step_log(idx, action_name, st, info)
         steps_log.append(s)
 
-        db.job_runs.update_one(run_key, {"$push": {"steps": s}})
-
         if st!="ok" and not step.get("continue_on_failure", False):
             status_overall = "error"
             break
 
     return status_overall, steps_log, successful_actions
 
+# -------------------- 잡 실행 (워커 스레드) --------------------
+JOB_EXECUTOR = None  # type: Optional[ThreadPoolExecutor]
+JOB_CONCURRENCY = 1
+# 워커를 기다리던 잡이 이 시간(예정 분 기준) 안에 시작하지 못하면 늦게 클레임하지 않고 건너뛴다
+QUEUED_JOB_GRACE_SEC = 60
+RUNNING_JOBS = set()  # 실행 중이거나 워커를 기다리는 잡 future (종료 시 대기 안내, 빈 워커 계산용)
+
+def _on_job_done(fut):
+    RUNNING_JOBS.discard(fut)
+    if fut.cancelled():
+        return
+    exc = fut.exception()
+    if exc is not None:
+        print("[job] 실행 오류:", exc, file=sys.stderr)
+
+def submit_job(fn, *args):
+    """클레임한 잡을 워커 스레드에서 실행해 스케줄러 루프가 막히지 않게 한다 (풀이 없으면 즉시 실행)"""
+    if JOB_EXECUTOR is None:
+        fn(*args)
+        return
+    fut = JOB_EXECUTOR.submit(fn, *args)
+    RUNNING_JOBS.add(fut)
+    fut.add_done_callback(_on_job_done)
+
+def drain_jobs():
+    """종료 시 아직 시작하지 않은 잡은 취소하고(클레임하지 않음) 실행 중인 잡이 끝날 때까지 기다린다"""
+    if JOB_EXECUTOR is None:
+        return
+    for fut in list(RUNNING_JOBS):
+        fut.cancel()
+    running = [fut for fut in list(RUNNING_JOBS) if not fut.cancelled()]
+    if running:
+        print(f"실행 중인 잡 {len(running)}개 완료 대기...")
+    JOB_EXECUTOR.shutdown(wait=True, cancel_futures=True)
+
+def free_job_slots() -> int:
+    """지금 바로 워커를 얻을 수 있는 잡 수 (풀이 없으면 잡을 하나씩 바로 실행하므로 1)"""
+    if JOB_EXECUTOR is None:
+        return 1
+    return max(0, JOB_CONCURRENCY - len(RUNNING_JOBS))
+
+def print_already_claimed(job_name: str):
+    if USE_RICH:
+        console.print(f"  [dim]• {job_name}: Already claimed[/dim]")
+    else:
+        print(f"  • {job_name}: Already claimed")
+
+def claim_and_run_job(db, job_doc: Dict[str,Any], sched_minute_utc: datetime, tick_minute_local: datetime,
+                      machine_id: str, hostname: str, my_order_value: int, my_position: int):
+    """워커를 기다리던 잡은 실제로 시작할 때 클레임한다 (미리 잡아 두면 에이전트가 죽었을 때 실행되지 않은 채 남는다)"""
+    late_sec = (datetime.now(timezone.utc) - sched_minute_utc).total_seconds()
+    if late_sec > QUEUED_JOB_GRACE_SEC:
+        name = job_doc.get('name', 'Unknown')
+        if USE_RICH:
+            console.print(f"  [yellow]• {name}: Skipped, no free worker within {QUEUED_JOB_GRACE_SEC}s "
+                          f"({late_sec:.0f}s late)[/yellow]")
+        else:
+            print(f"  • {name}: Skipped, no free worker within {QUEUED_JOB_GRACE_SEC}s ({late_sec:.0f}s late)")
+        return
+    if not claim_job_runs(db, [job_doc], sched_minute_utc, machine_id, my_order_value, my_position)[0]:
+        print_already_claimed(job_doc.get('name', 'Unknown'))
+        return
+    run_claimed_job(db, job_doc, sched_minute_utc, tick_minute_local,
+                    machine_id, hostname, my_order_value, my_position)
+
+def run_claimed_job(db, job_doc: Dict[str,Any], sched_minute_utc: datetime, tick_minute_local: datetime,
+                    machine_id: str, hostname: str, my_order_value: int, my_position: int):
+    """클레임에 성공한 잡 하나를 실행하고 결과를 job_runs에 기록"""
+    print_job_start(job_doc.get('name', 'Unknown'), my_order_value, my_position, job_doc)
+    start_utc = datetime.now(timezone.utc)
+    start_mono = time.monotonic()
+    run_key = {"job_id": job_doc["_id"], "scheduled_for": sched_minute_utc}
+
+    job_defaults = job_doc.get("_http_defaults") or build_job_defaults(job_doc)
+    if job_doc.get("actions"):
+        status, steps, successful_actions = execute_actions(job_doc, tick_minute_local, job_defaults)
+        total_actions = len(job_doc.get("actions", []))
+    else:
+        step = {
+            "type": "http", "name": job_doc.get("name", "(http)"),
+            "method": job_doc.get("method", "GET"), "url": job_doc.get("url"),
+            "headers": job_doc.get("headers"), "params": job_doc.get("params"), "body": job_doc.get("body"),
+            "timeout_sec": job_doc.get("timeout_sec"),
+            "retry": job_doc.get("retry"),
+            "use_curl": job_doc.get("use_curl", False),
+            "use_cloudscraper": job_doc.get("use_cloudscraper", False),
+            "_resolved": job_doc.get("_resolved")
+        }
+
+        print_action_start(step["name"], 0, 1, step)
+
+        st, info = run_http_with_retry_with_progress(step, job_defaults)
+
+        print_action_progress(step["name"], st, info.get("elapsed_ms", 0), info.get("attempts", 1))
+
+        s = build_step_log(0, step["name"], st, info)
+        successful_actions = 1 if st == "ok" else 0
+        status = "ok" if st == "ok" else "error"
+        total_actions = 1
+        steps = [s]
+
+    end_utc = datetime.now(timezone.utc)
+    recorded_steps = [s for s in steps if s.get("status") not in SKIPPED_STEP_STATUSES]
+    db.job_runs.update_one(run_key, {"$set": {"start_at": start_utc, "end_at": end_utc, "status": status},
+                                     "$push": {"steps": {"$each": recorded_steps}}})
+    # start_at/end_at은 기록용 벽시계, 소요 시간은 NTP 보정에 영향받지 않는 monotonic 기준
+    elapsed = int((time.monotonic() - start_mono) * 1000)
+    print_job_result(job_doc.get('name', 'Unknown'), status, elapsed, total_actions, successful_actions)
+    if NOTIFIER:
+        try:
+            NOTIFIER.notify_job_result(
+                job_name=job_doc.get('name', 'Unknown'),
+                status=status,
+                elapsed_ms=elapsed,
+                scheduled_local=tick_minute_local,
+                machine_id=machine_id,
+                hostname=hostname,
+                order_value=my_order_value,
+                order_position=my_position,
+                steps=steps,
+                total_actions=total_actions,
+                successful_actions=successful_actions
+            )
+        except Exception as notify_err:
+            print(f"[notify] Error while sending Telegram message: {notify_err}", file=sys.stderr)
+
 # -------------------- 분 단위 처리 --------------------
 def process_minute(db, jobs_cache: JobsCache, machine_id: str, hostname: str,
-                   tick_minute_local: datetime, check_marker):
-    sched_minute_utc = to_utc_minute(tick_minute_local)
+                   tick_minute_local: datetime, check_marker,
+                   sched_minute_utc: Optional[datetime] = None):
+    if sched_minute_utc is None:
+        sched_minute_utc = to_utc_minute(tick_minute_local)
 
     if check_marker == 0:
-        update_heartbeat(db, machine_id, sched_minute_utc)
-        jobs_cache.reload()
+        machine_doc = update_heartbeat(db, machine_id, sched_minute_utc)
+        jobs_cache.reload_if_unwatched()
 
-        machines, my_position, my_order_value = get_order_context(db, machine_id, hostname)
-        total_count = len(machines)
-        online_count = sum(1 for m in machines if m.get("last_online_minute") == sched_minute_utc)
+        my_position, my_order_value, total_count, online_count, earlier_online = get_order_context(
+            db, machine_id, hostname, sched_minute_utc, machine_doc)
 
         wait_seconds = max(0, (my_position - 1) * OFFSET_STEP_SEC)
 
@@ -932,15 +1600,39 @@ def process_minute(db, jobs_cache: JobsCache, machine_id: str, hostname: str,
             console.print(msg) if USE_RICH else print(msg)
             return (online_count, total_count)
 
+        if earlier_online:
+            # 앞순서 머신이 이미 하트비트를 남겼으면 대기 후 재확인할 필요가 없다
+            msg = "  Earlier machine already reported in this minute; standing down"
+            console.print(f"[dim]{msg}[/dim]") if USE_RICH else print(msg)
+            return (online_count, total_count)
+
         if wait_seconds > 0:
-            show_order_wait_countdown(wait_seconds)
+            # 대기 중 앞순서 머신의 하트비트가 change stream으로 들어오면 즉시 물러난다
+            ahead_ev, watch_stop = threading.Event(), threading.Event()
+            threading.Thread(target=watch_ahead_heartbeats,
+                             args=(db, my_order_value, machine_id, sched_minute_utc, ahead_ev, watch_stop),
+                             daemon=True).start()
+            try:
+                # 하트비트/집계에 걸린 시간만큼 밀리지 않도록 분 경계 기준 절대 시각까지 대기
+                woken = show_order_wait_countdown(tick_minute_local + timedelta(seconds=wait_seconds), ahead_ev)
+            finally:
+                watch_stop.set()
+            if woken:
+                msg = "  Earlier machine reported in this minute; standing down"
+                console.print(f"[dim]{msg}[/dim]") if USE_RICH else print(msg)
+                return (online_count, total_count)
             return (my_position, my_order_value, online_count, total_count)
 
     else:
-        machines, my_position, my_order_value = get_order_context(db, machine_id, hostname)
-        total_count = len(machines)
-        online_count = sum(1 for m in machines if m.get("last_online_minute") == sched_minute_utc)
-        check_second = (my_position - 1) * OFFSET_STEP_SEC if isinstance(check_marker, tuple) else int(check_marker)
+        if isinstance(check_marker, tuple):
+            # 같은 분의 첫 패스에서 구한 순서를 재사용하고, 앞순서 온라인 여부만 다시 확인
+            my_position, my_order_value, online_count, total_count = check_marker
+            earlier_online = has_ahead_online(db, my_order_value, machine_id, sched_minute_utc)
+            check_second = (my_position - 1) * OFFSET_STEP_SEC
+        else:
+            my_position, my_order_value, total_count, online_count, earlier_online = get_order_context(
+                db, machine_id, hostname, sched_minute_utc)
+            check_second = int(check_marker)
 
         if USE_RICH:
             console.print(
@@ -958,7 +1650,7 @@ def process_minute(db, jobs_cache: JobsCache, machine_id: str, hostname: str,
             console.print(msg) if USE_RICH else print(msg)
             return (online_count, total_count)
 
-        if check_earlier_machines_online(machines, my_position, sched_minute_utc):
+        if earlier_online:
             msg = "  Earlier machine reported in this minute; standing down"
             console.print(f"[dim]{msg}[/dim]") if USE_RICH else print(msg)
             return (online_count, total_count)
@@ -977,97 +1669,44 @@ def process_minute(db, jobs_cache: JobsCache, machine_id: str, hostname: str,
             print(f"No jobs at {tick_minute_local:%H:%M}")
         return
 
-    for job in jobs:
-        job_doc = db.jobs.find_one({"_id": job["_id"], "enabled": True})
-        if not job_doc:
-            if USE_RICH:
-                console.print(f"  [dim]• {job.get('name','Unknown')}: Disabled/deleted[/dim]")
-            else:
-                print(f"  • {job.get('name','Unknown')}: Disabled/deleted")
+    # 캐시는 매 분 시작(check_marker == 0)과 reload_jobs 명령 시 갱신되므로 잡 문서를 다시 조회하지 않는다
+    # 바로 워커를 얻는 잡만 한 번의 bulk_write로 클레임하고, 대기열에 들어갈 잡은 시작 직전에 하나씩 클레임한다
+    n_now = free_job_slots()
+    claimed = claim_job_runs(db, jobs[:n_now], sched_minute_utc, machine_id, my_order_value, my_position)
+    for job_doc, won in zip(jobs, claimed):
+        if not won:
+            print_already_claimed(job_doc.get('name', 'Unknown'))
             continue
 
-        if not claim_job_run(db, job_doc, sched_minute_utc, machine_id, my_order_value, my_position):
-            if USE_RICH:
-                console.print(f"  [dim]• {job_doc.get('name','Unknown')}: Already claimed[/dim]")
-            else:
-                print(f"  • {job_doc.get('name','Unknown')}: Already claimed")
-            continue
-
-        print_job_start(job_doc.get('name', 'Unknown'), my_order_value, my_position, job_doc)
-        start_utc = datetime.now(timezone.utc)
-        run_key = {"job_id": job_doc["_id"], "scheduled_for": sched_minute_utc}
-
-        if job_doc.get("actions"):
-            status, steps, successful_actions = execute_actions(db, run_key, job_doc, tick_minute_local, {})
-            total_actions = len(job_doc.get("actions", []))
-        else:
-            step = {
-                "type": "http", "name": job_doc.get("name", "(http)"),
-                "method": job_doc.get("method", "GET"), "url": job_doc.get("url"),
-                "headers": job_doc.get("headers"), "params": job_doc.get("params"), "body": job_doc.get("body"),
-                "timeout_sec": job_doc.get("timeout_sec"),
-                "retry": job_doc.get("retry"),
-                "use_curl": job_doc.get("use_curl", False),
-                "use_cloudscraper": job_doc.get("use_cloudscraper", False)
-            }
-
-            print_action_start(step["name"], 0, 1, step)
-
-            st, info = run_http_with_retry_with_progress(step, {**CFG.get("http_defaults", {}),
-                                                   "timeout_sec": job_doc.get("timeout_sec", CFG.get("http_defaults", {}).get("timeout_sec", 10)),
-                                                   "retry": job_doc.get("retry", CFG.get("http_defaults", {}).get("retry", {}))})
-
-            print_action_progress(step["name"], st, info.get("elapsed_ms", 0), info.get("attempts", 1))
-
-            s = {"index": 0, "name": step["name"], "status": st}
-            if st == "ok":
-                s.update({"status_code": info.get("status_code"), "elapsed_ms": info.get("elapsed_ms"),
-                          "attempts": info.get("attempts"), "response_sample": info.get("response_sample")})
-                successful_actions = 1
-            else:
-                s.update({"error": info.get("error"), "elapsed_ms": info.get("elapsed_ms"),
-                          "attempts": info.get("attempts"), "status_code": info.get("status_code")})
-                successful_actions = 0
-            db.job_runs.update_one(run_key, {"$push": {"steps": s}})
-            status = "ok" if st == "ok" else "error"
-            total_actions = 1
-            steps = [s]
-
-        end_utc = datetime.now(timezone.utc)
-        db.job_runs.update_one(run_key, {"$set": {"start_at": start_utc, "end_at": end_utc, "status": status}})
-        elapsed = int((end_utc - start_utc).total_seconds() * 1000)
-        print_job_result(job_doc.get('name', 'Unknown'), status, elapsed, total_actions, successful_actions)
-        if NOTIFIER:
-            try:
-                NOTIFIER.notify_job_result(
-                    job_name=job_doc.get('name', 'Unknown'),
-                    status=status,
-                    elapsed_ms=elapsed,
-                    scheduled_local=tick_minute_local,
-                    machine_id=machine_id,
-                    hostname=hostname,
-                    order_value=my_order_value,
-                    order_position=my_position,
-                    steps=steps,
-                    total_actions=total_actions,
-                    successful_actions=successful_actions
-                )
-            except Exception as notify_err:
-                print(f"[notify] Error while sending Telegram message: {notify_err}", file=sys.stderr)
+        submit_job(run_claimed_job, db, job_doc, sched_minute_utc, tick_minute_local,
+                   machine_id, hostname, my_order_value, my_position)
+    for job_doc in jobs[n_now:]:
+        submit_job(claim_and_run_job, db, job_doc, sched_minute_utc, tick_minute_local,
+                   machine_id, hostname, my_order_value, my_position)
 
     return (online_count, total_count)
 
 # -------------------- 예쁜 출력 함수들 --------------------
-def show_order_wait_countdown(wait_seconds: int):
-    """order 대기 시간 카운트다운 표시"""
+def interruptible_sleep(seconds: float, wake_ev: Optional[threading.Event] = None) -> bool:
+    """seconds 동안 대기한다. wake_ev가 설정되면 즉시 깨어나 True를 반환"""
+    if wake_ev is None:
+        time.sleep(max(0, seconds))
+        return False
+    return wake_ev.wait(max(0, seconds))
+
+def show_order_wait_countdown(target_time: datetime, wake_ev: Optional[threading.Event] = None) -> bool:
+    """분 경계 기준으로 계산한 order 확인 시각까지 대기 (카운트다운 표시). wake_ev로 중단되면 True 반환"""
+    wait_seconds = (target_time - datetime.now(target_time.tzinfo)).total_seconds()
+    if wait_seconds <= 0:
+        return False
     if not USE_RICH:
-        print(f"  ⏳ Waiting {wait_seconds}s to check...")
-        return
+        print(f"  ⏳ Waiting {int(wait_seconds)}s to check...")
+        return interruptible_sleep(wait_seconds, wake_ev)
     
-    start_time = time.time()
+    start_time = time.monotonic()
     with Live(console=console, refresh_per_second=2) as live:
         while True:
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             remaining = wait_seconds - elapsed
             
             if remaining <= 0:
@@ -1085,37 +1724,51 @@ def show_order_wait_countdown(wait_seconds: int):
             text.append(f"\n  [{bar}] {progress:.0f}%", style="green")
             
             live.update(text)
-            time.sleep(0.5)
-
-def show_countdown(target_time: datetime, next_job_name: str = "Next job", machine_id: str = "", hostname: str = "", order_value: int = 0):
-    """실시간 카운트다운 타이머 표시"""
+            # 마지막 구간은 남은 시간만큼만 자서 확인 시각을 넘기지 않는다
+            if interruptible_sleep(min(0.5, remaining), wake_ev):
+                return True
+    return False
+
+def show_countdown(target_time: datetime, next_job_name: str = "Next job", machine_id: str = "", hostname: str = "", order_value: int = 0,
+                   wake_ev: Optional[threading.Event] = None) -> bool:
+    """실시간 카운트다운 타이머 표시. wake_ev로 중단되면 True 반환"""
     if not USE_RICH:
         sleep_sec = (target_time - datetime.now(target_time.tzinfo)).total_seconds()
         if sleep_sec > 0:
             print(f"⏰ Waiting {int(sleep_sec)}s until {target_time:%H:%M:%S} for {next_job_name}")
-            time.sleep(sleep_sec)
-        return
+            return interruptible_sleep(sleep_sec, wake_ev)
+        return False
+    
+    # 헤더/잡 정보 패널은 대기 중 바뀌지 않으므로 한 번만 만들고 타이머 패널만 갱신
+    layout = Layout()
+    layout.split_column(
+        Layout(name="header", size=3),
+        Layout(name="timer", size=7),
+        Layout(name="info", size=5)
+    )
+    
+    header_text = Text()
+    header_text.append("🤖 FleetCron Agent ", style="bold cyan")
+    header_text.append(f"[{hostname}]", style="yellow")
+    header_text.append(f" Order {order_value}", style="green")
+    layout["header"].update(Panel(header_text, title="[bold blue]System Info[/bold blue]"))
+    
+    info_table = Table.grid(padding=1)
+    info_table.add_column(style="cyan", justify="right")
+    info_table.add_column(style="white")
+    info_table.add_row("📋 Next Job:", f"[bold yellow]{next_job_name}[/bold yellow]")
+    info_table.add_row("🆔 Machine ID:", f"[dim]{machine_id[:8]}...[/dim]")
+    info_table.add_row("🌐 Timezone:", f"{ACTUAL_TZ_NAME}")
+    layout["info"].update(Panel(info_table, title="[bold magenta]Job Info[/bold magenta]"))
+    timer_title = f"[bold yellow]⏰ Next: {target_time:%H:%M:%S}[/bold yellow]"
+    target_ts = target_time.timestamp()
     
-    with Live(console=console, refresh_per_second=1) as live:
+    with Live(layout, console=console, refresh_per_second=1) as live:
         while True:
-            now = datetime.now(target_time.tzinfo)
-            remaining = (target_time - now).total_seconds()
+            remaining = target_ts - time.time()
             
             if remaining <= 0:
-                break
-                
-            layout = Layout()
-            layout.split_column(
-                Layout(name="header", size=3),
-                Layout(name="timer", size=7),
-                Layout(name="info", size=5)
-            )
-            
-            header_text = Text()
-            header_text.append("🤖 FleetCron Agent ", style="bold cyan")
-            header_text.append(f"[{hostname}]", style="yellow")
-            header_text.append(f" Order {order_value}", style="green")
-            layout["header"].update(Panel(header_text, title="[bold blue]System Info[/bold blue]"))
+                return False
             
             timer_text = Text(justify="center")
             mins, secs = divmod(int(remaining), 60)
@@ -1131,47 +1784,46 @@ def show_countdown(target_time: datetime, next_job_name: str = "Next job", machi
                 bar = "█" * filled + "░" * (bar_length - filled)
                 timer_text.append(f"\n[{bar}] {progress:.1f}%\n", style="green")
             
-            layout["timer"].update(Panel(timer_text, title=f"[bold yellow]⏰ Next: {target_time:%H:%M:%S}[/bold yellow]"))
-            
-            info_table = Table.grid(padding=1)
-            info_table.add_column(style="cyan", justify="right")
-            info_table.add_column(style="white")
-            info_table.add_row("📋 Next Job:", f"[bold yellow]{next_job_name}[/bold yellow]")
-            info_table.add_row("🆔 Machine ID:", f"[dim]{machine_id[:8]}...[/dim]")
-            info_table.add_row("🌐 Timezone:", f"{ACTUAL_TZ_NAME}")
-            
-            layout["info"].update(Panel(info_table, title="[bold magenta]Job Info[/bold magenta]"))
-            
+            layout["timer"].update(Panel(timer_text, title=timer_title))
             live.update(layout)
-            time.sleep(0.5)
+            # 남은 초 표시가 바뀌는 순간까지만 자서 초 경계에 맞춰 다시 그린다 (마지막 구간은 목표 시각에 정확히)
+            if interruptible_sleep(remaining % 1 or 1.0, wake_ev):
+                return True
 
-def show_long_wait_countdown(wait_seconds: int, next_time: datetime, next_job_name: str):
-    """긴 대기 시간 동안 카운트다운과 프로그레스 바 표시"""
+def show_long_wait_countdown(wait_seconds: int, next_time: datetime, next_job_name: str,
+                             wake_ev: Optional[threading.Event] = None) -> bool:
+    """긴 대기 시간 동안 카운트다운과 프로그레스 바 표시. wake_ev로 중단되면 True 반환"""
     if not USE_RICH:
-        time.sleep(wait_seconds)
-        return
+        return interruptible_sleep(wait_seconds, wake_ev)
     
-    start_time = time.time()
-    with Live(console=console, refresh_per_second=1) as live:
+    # 상태/정보 패널은 고정이므로 한 번만 만든다
+    layout = Layout()
+    layout.split_column(
+        Layout(name="status", size=3),
+        Layout(name="progress", size=5),
+        Layout(name="info", size=4)
+    )
+    
+    status_text = Text(justify="center")
+    status_text.append("⏸  Long Wait Mode", style="bold yellow")
+    layout["status"].update(Panel(status_text, border_style="yellow"))
+    
+    info_table = Table.grid(padding=0)
+    info_table.add_column(style="cyan", justify="right")
+    info_table.add_column(style="white")
+    info_table.add_row("📋 Next Job:", f"[yellow]{next_job_name}[/yellow]")
+    info_table.add_row("⏰ Scheduled:", f"{next_time:%H:%M:%S}")
+    layout["info"].update(Panel(info_table, border_style="dim"))
+    progress_title = f"Next Check: {next_time:%H:%M}"
+    
+    start_time = time.monotonic()
+    with Live(layout, console=console, refresh_per_second=1) as live:
         while True:
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             remaining = wait_seconds - elapsed
             
             if remaining <= 0:
-                break
-            
-            # 레이아웃 생성
-            layout = Layout()
-            layout.split_column(
-                Layout(name="status", size=3),
-                Layout(name="progress", size=5),
-                Layout(name="info", size=4)
-            )
-            
-            # 상태 표시
-            status_text = Text(justify="center")
-            status_text.append("⏸  Long Wait Mode", style="bold yellow")
-            layout["status"].update(Panel(status_text, border_style="yellow"))
+                return False
             
             # 프로그레스 표시
             progress_text = Text(justify="center")
@@ -1185,19 +1837,10 @@ def show_long_wait_countdown(wait_seconds: int, next_time: datetime, next_job_na
             bar = "█" * filled + "░" * (bar_length - filled)
             progress_text.append(f"\n[{bar}] {progress:.1f}%", style="green")
             
-            layout["progress"].update(Panel(progress_text, title=f"Next Check: {next_time:%H:%M}", border_style="cyan"))
-            
-            # 정보 표시
-            info_table = Table.grid(padding=0)
-            info_table.add_column(style="cyan", justify="right")
-            info_table.add_column(style="white")
-            info_table.add_row("📋 Next Job:", f"[yellow]{next_job_name}[/yellow]")
-            info_table.add_row("⏰ Scheduled:", f"{next_time:%H:%M:%S}")
-            
-            layout["info"].update(Panel(info_table, border_style="dim"))
-            
+            layout["progress"].update(Panel(progress_text, title=progress_title, border_style="cyan"))
             live.update(layout)
-            time.sleep(1)
+            if interruptible_sleep(remaining % 1 or 1.0, wake_ev):
+                return True
 
 def print_job_start(job_name: str, order_value: int, order_position: int, job_config: Dict[str, Any] = None):
     """작업 시작 시 상세 정보 출력"""
@@ -1211,10 +1854,11 @@ def print_job_start(job_name: str, order_value: int, order_position: int, job_co
         table.add_row("📐 Position", f"#{order_position}")
         
         if job_config:
-            timeout = job_config.get("timeout_sec", CFG.get("http_defaults", {}).get("timeout_sec", 30))
+            defaults = job_config.get("_http_defaults") or build_job_defaults(job_config)
+            timeout = defaults["timeout_sec"]
             table.add_row("⏱️ Timeout", f"{timeout}s")
             
-            retry_config = job_config.get("retry", CFG.get("http_defaults", {}).get("retry", {}))
+            retry_config = defaults["retry"]
             retries = retry_config.get("retries", 3)
             delay = retry_config.get("delay_sec", 1)
             backoff = retry_config.get("backoff", 1.0)
@@ -1226,14 +1870,13 @@ def print_job_start(job_name: str, order_value: int, order_position: int, job_co
             elif job_config.get("url"):
                 table.add_row("🌐 Type", "Single HTTP request")
         
-        console.print("\n")
-        console.print(Panel(table, title="[bold green]🚀 Starting Job[/bold green]", border_style="green"))
+        console.print("\n", Panel(table, title="[bold green]🚀 Starting Job[/bold green]", border_style="green"))
     else:
-        print(f"\n🚀 Starting: {job_name} (order {order_value}, position #{order_position})")
+        line = f"\n🚀 Starting: {job_name} (order {order_value}, position #{order_position})"
         if job_config:
-            timeout = job_config.get("timeout_sec", 30)
-            retry = job_config.get("retry", {})
-            print(f"   ⏱️ Timeout: {timeout}s | 🔄 Retries: {retry.get('retries', 0)}")
+            defaults = job_config.get("_http_defaults") or build_job_defaults(job_config)
+            line += f"\n   ⏱️ Timeout: {defaults['timeout_sec']}s | 🔄 Retries: {defaults['retry'].get('retries', 0)}"
+        print(line)
 
 def print_action_start(action_name: str, action_index: int, total_actions: int, action_config: Dict[str, Any] = None):
     """액션 시작 시 상세 정보 출력"""
@@ -1255,9 +1898,10 @@ def print_action_start(action_name: str, action_index: int, total_actions: int,
             if action_config.get("when"):
                 details.append("⚡ Conditional")
         
-        console.print(f"\n  {progress_text} [bold]{action_name}[/bold]")
+        line = f"\n  {progress_text} [bold]{action_name}[/bold]"
         if details:
-            console.print(f"    {' | '.join(details)}")
+            line += f"\n    {' | '.join(details)}"
+        console.print(line)
     else:
         print(f"\n  ▶ Action {action_index + 1}/{total_actions}: {action_name}")
 
@@ -1283,23 +1927,22 @@ def print_action_progress(action_name: str, status: str, elapsed_ms: int = 0, at
             print(f"    {symbol} {status.capitalize()} ({elapsed_ms}ms)")
 
 def print_job_result(job_name: str, status: str, elapsed_ms: int = 0, total_actions: int = 0, successful_actions: int = 0):
-    """작업 결과 출력"""
+    """작업 결과 출력 (여러 잡 스레드의 출력이 섞이지 않도록 한 번에 출력)"""
     if USE_RICH:
         if status == "ok":
-            console.print(f"\n[bold green]✅ Job Completed Successfully[/bold green]")
-            console.print(f"   [dim]{job_name} - {elapsed_ms}ms total[/dim]")
-            if total_actions > 0:
-                console.print(f"   [dim]{successful_actions}/{total_actions} actions succeeded[/dim]")
+            lines = ["\n[bold green]✅ Job Completed Successfully[/bold green]"]
         else:
-            console.print(f"\n[bold red]❌ Job Failed[/bold red]")
-            console.print(f"   [dim]{job_name} - {elapsed_ms}ms total[/dim]")
-            if total_actions > 0:
-                console.print(f"   [dim]{successful_actions}/{total_actions} actions succeeded[/dim]")
+            lines = ["\n[bold red]❌ Job Failed[/bold red]"]
+        lines.append(f"   [dim]{job_name} - {elapsed_ms}ms total[/dim]")
+        if total_actions > 0:
+            lines.append(f"   [dim]{successful_actions}/{total_actions} actions succeeded[/dim]")
+        console.print("\n".join(lines))
     else:
         symbol = "✅" if status == "ok" else "❌"
-        print(f"\n{symbol} {job_name}: {status} ({elapsed_ms}ms)")
+        lines = [f"\n{symbol} {job_name}: {status} ({elapsed_ms}ms)"]
         if total_actions > 0:
-            print(f"   {successful_actions}/{total_actions} actions completed")
+            lines.append(f"   {successful_actions}/{total_actions} actions completed")
+        print("\n".join(lines))
 
 # -------------------- 메인 --------------------
 def agent_main():
@@ -1307,9 +1950,10 @@ def agent_main():
     machine_id = load_or_create_machine_id()
     hostname = socket.gethostname()
     db = get_db()
+    ensure_indexes(db)
     machine_doc = ensure_machine_record(db, machine_id, hostname)
     initial_order_value = extract_order_value(machine_doc)
-    global NOTIFIER
+    global NOTIFIER, JOB_EXECUTOR, JOB_CONCURRENCY
     NOTIFIER = NotificationManager(db)
     
     # 실제 타임존 정보 표시
@@ -1334,12 +1978,18 @@ def agent_main():
         print(f"🚀 Started: machine_id={machine_id}, host={hostname}, order={initial_order_value}, tz={tz_display}, offset={OFFSET_STEP_SEC}s")
 
     jobs_cache = JobsCache(db)
+    JOB_CONCURRENCY = max(1, int(CFG.get("job_concurrency", 8)))
+    JOB_EXECUTOR = ThreadPoolExecutor(max_workers=JOB_CONCURRENCY, thread_name_prefix="fleetcron-job")
     stop_ev = threading.Event()
     t = threading.Thread(target=commands_watcher, args=(db, machine_id, jobs_cache, stop_ev, NOTIFIER), daemon=True)
     t.start()
+    threading.Thread(target=jobs_watcher, args=(db, jobs_cache, stop_ev), daemon=True).start()
+    threading.Thread(target=job_runs_archiver, args=(db, machine_id, stop_ev), daemon=True).start()
 
     def handle_sig(sig, frame):
         stop_ev.set(); print("종료 신호 수신."); 
+        # 실행 중인 잡이 모두 끝난 뒤에 단일 인스턴스 락을 놓아 재시작된 에이전트와 겹치지 않게 한다
+        drain_jobs()
         try: lock_handle.close()
         except Exception: pass
         sys.exit(0)
@@ -1349,6 +1999,8 @@ def agent_main():
         signal.signal(signal.SIGTERM, handle_sig)
 
     while True:
+        # 이 시점 이후의 잡 리로드(reload_jobs 등)가 대기를 깨워 스케줄을 다시 계산하게 한다
+        jobs_cache.wakeup_ev.clear()
         now_local = datetime.now(CRON_TZ)
         
         next_schedule = jobs_cache.get_next_schedule(now_local)
@@ -1364,8 +2016,8 @@ def agent_main():
                 console.print(f"[yellow]⏸  No jobs scheduled. Checking again at {next_check:%H:%M}[/yellow]")
             else:
                 print(f"⏸  No jobs. Check at {next_check:%H:%M} ({int(sleep_sec)}s)")
-            time.sleep(sleep_sec)
-            jobs_cache.reload()
+            if not interruptible_sleep(sleep_sec, jobs_cache.wakeup_ev):
+                jobs_cache.reload_if_unwatched()
             continue
         
         sleep_sec = (next_schedule - now_local).total_seconds()
@@ -1380,29 +2032,36 @@ def agent_main():
                 console.print(f"[dim]⏸  Long wait. Next job at {next_schedule:%H:%M}[/dim]")
                 console.print(f"[dim]   📋 Next: {next_job_name}[/dim]")
                 # 30분 카운트다운 표시
-                show_long_wait_countdown(max_sleep, next_schedule, next_job_name)
+                woken = show_long_wait_countdown(max_sleep, next_schedule, next_job_name, jobs_cache.wakeup_ev)
             else:
                 print(f"⏸  Long wait. Next: {next_schedule:%H:%M} ({next_job_name})")
-                time.sleep(max_sleep)
-            jobs_cache.reload()
+                woken = interruptible_sleep(max_sleep, jobs_cache.wakeup_ev)
+            if not woken:
+                jobs_cache.reload_if_unwatched()
             continue
         
         if sleep_sec > 0:
             next_jobs = jobs_cache.list_for(next_schedule.hour, next_schedule.minute)
             next_job_name = next_jobs[0].get('name', 'Unknown Job') if next_jobs else 'Unknown Job'
-            current_doc = db.machines.find_one({"machine_id": machine_id})
+            current_doc = db.machines.find_one({"machine_id": machine_id},
+                                               {key: 1 for key in ORDER_FIELD_ALIASES})
             current_order_value = extract_order_value(current_doc)
-            show_countdown(next_schedule, next_job_name, machine_id, hostname, current_order_value)
+            if show_countdown(next_schedule, next_job_name, machine_id, hostname, current_order_value,
+                              jobs_cache.wakeup_ev):
+                continue
 
         try:
-            result = process_minute(db, jobs_cache, machine_id, hostname, next_schedule, 0)
+            # 같은 분의 두 번의 process_minute 호출이 UTC 변환 결과를 공유
+            sched_minute_utc = to_utc_minute(next_schedule)
+            result = process_minute(db, jobs_cache, machine_id, hostname, next_schedule, 0, sched_minute_utc)
 
             if isinstance(result, tuple):
                 if len(result) == 4:
                     my_position, my_order_value, online_count, total_count = result
                     final_result = process_minute(
                         db, jobs_cache, machine_id, hostname, next_schedule,
-                        (my_position, my_order_value, online_count, total_count)
+                        (my_position, my_order_value, online_count, total_count),
+                        sched_minute_utc
                     )
                     if isinstance(final_result, tuple) and len(final_result) == 2:
                         online, total = final_result
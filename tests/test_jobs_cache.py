@@ -0,0 +1,36 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent
+
+
+class FakeJobs:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return [dict(d) for d in self.docs]
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.jobs = FakeJobs(docs)
+
+
+def test_out_of_range_slots_are_ignored():
+    cache = agent.JobsCache(FakeDB([
+        {"_id": 1, "name": "hour24", "enabled": True, "hour": 24, "minute": 0, "url": "http://x"},
+        {"_id": 2, "name": "minute60", "enabled": True, "hour": 1, "minute": 60, "url": "http://x"},
+        {"_id": 3, "name": "negative", "enabled": True, "hour": -1, "minute": 5, "url": "http://x"},
+        {"_id": 4, "name": "every_hour_bad", "enabled": True, "minute": 75, "url": "http://x"},
+        {"_id": 5, "name": "ok", "enabled": True, "hour": 23, "minute": 59, "url": "http://x"},
+    ]))
+
+    assert cache.list_for(2, 0) == []
+    assert cache.list_for(0, 0) == []
+    assert [j["name"] for j in cache.list_for(23, 59)] == ["ok"]
+    assert cache.get_next_schedule(datetime(2026, 1, 1, 23, 58)) == datetime(2026, 1, 1, 23, 59)
+    assert cache.get_next_schedule(datetime(2026, 1, 1, 23, 59)) == datetime(2026, 1, 2, 23, 59)
@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent
+
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """run_http_with_retry_with_progress를 스텁으로 바꾸고 호출된 액션 이름을 순서대로 기록"""
+    order = []
+    lock = threading.Lock()
+
+    def fake_run(step, defaults):
+        with lock:
+            order.append(step["name"])
+        if step.get("fail"):
+            return "error", {"error": "boom", "attempts": 1}
+        return "ok", {"status_code": 200, "attempts": 1}
+
+    monkeypatch.setattr(agent, "run_http_with_retry_with_progress", fake_run)
+    monkeypatch.setattr(agent, "USE_RICH", False)
+    return order
+
+
+def run(actions):
+    for a in actions:
+        agent.prepare_when(a.get("when"))
+    return agent.execute_actions_parallel({"parallel": True, "actions": actions}, NOW, {})
+
+
+def statuses(steps):
+    return {s["name"]: s["status"] for s in steps}
+
+
+def test_chain_runs_in_dependency_order(calls):
+    status, steps, ok = run([
+        {"name": "c", "url": "u", "depends_on": "b"},
+        {"name": "a", "url": "u"},
+        {"name": "b", "url": "u", "depends_on": 1},
+    ])
+    assert calls == ["a", "b", "c"]
+    assert status == "ok" and ok == 3
+    assert [s["index"] for s in steps] == [0, 1, 2]
+
+
+def test_failed_dependency_skips_dependents(calls):
+    status, steps, ok = run([
+        {"name": "a", "url": "u", "fail": True},
+        {"name": "b", "url": "u", "depends_on": "a"},
+        {"name": "c", "url": "u", "depends_on": "b"},
+        {"name": "d", "url": "u"},
+    ])
+    assert sorted(calls) == ["a", "d"]
+    assert statuses(steps) == {"a": "error", "b": "skipped_dependency",
+                               "c": "skipped_dependency", "d": "ok"}
+    assert status == "error" and ok == 1
+
+
+def test_cycle_is_cut_and_reported(calls):
+    status, steps, ok = run([
+        {"name": "a", "url": "u", "depends_on": "b"},
+        {"name": "b", "url": "u", "depends_on": "a"},
+        {"name": "c", "url": "u"},
+    ])
+    assert calls == ["c"]
+    assert statuses(steps) == {"a": "skipped_dependency", "b": "skipped_dependency", "c": "ok"}
+    assert status == "error"
+
+
+def test_unknown_and_skipped_dependencies_count_as_satisfied(calls):
+    status, steps, ok = run([
+        {"name": "gated", "url": "u", "when": {"hour_in": [3]}},
+        {"name": "x", "url": "u", "depends_on": ["missing", 99]},
+        {"name": "y", "url": "u", "depends_on": "gated"},
+    ])
+    assert sorted(calls) == ["x", "y"]
+    assert statuses(steps) == {"gated": "skipped_when", "x": "ok", "y": "ok"}
+    assert status == "ok" and [s["index"] for s in steps] == [0, 1, 2]